@@ -0,0 +1,39 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Build tools for the RESCS SHACL shapes library.
+
+Heavy dependencies (pyld, rdflib, pyshacl, requests) are only imported when a function needing them is called,
+so that importing the package and its modules stays cheap.
+The functions return the generated graphs in memory, writing files is left to the caller
+(or to the `build_files` and `transform_file` functions, respectively the command line interface:
+`python3 -m rescs_shapes`).
+The functions re-exported here are named differently from the submodules, so `rescs_shapes.build` etc.
+still refer to the modules.
+"""
+
+from rescs_shapes.analysis import Issue, ShapesIndex
+from rescs_shapes.build import load_schemas, load_ontology, build_shapes_graph, build_shapes_ontology_graph, \
+    build_files
+from rescs_shapes.check import load_index, check_shapes, built_shapes, validate_changed_shapes
+from rescs_shapes.ingest import ingest_resources
+from rescs_shapes.model import ShapesModel, NodeShape, PropertyShape, load_model, model_to_jsonld
+from rescs_shapes.register import register_schemas
+from rescs_shapes.report import ReportAggregator
+from rescs_shapes.transform import transform_shapes_graph, transform_file
+from rescs_shapes.validate import load_graph, validate_data, iter_results
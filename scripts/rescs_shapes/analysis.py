@@ -0,0 +1,315 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Union
+
+if TYPE_CHECKING:
+    from rescs_shapes.model import ShapesModel
+
+SH = 'http://www.w3.org/ns/shacl#'
+NXV_SHAPES = 'https://bluebrain.github.io/nexus/vocabulary/shapes'
+OWL_IMPORTS = 'http://www.w3.org/2002/07/owl#imports'
+RDFS_SUBCLASS_OF = 'http://www.w3.org/2000/01/rdf-schema#subClassOf'
+
+
+class Issue(NamedTuple):
+    """
+    A problem detected in the shapes library.
+    """
+    kind: str
+    subject: str
+    message: str
+
+
+class ShapesIndex:
+    """
+    In-memory indexes over the schema source files and the ontology,
+    built once and shared by all checks.
+    """
+
+    def __init__(self) -> None:
+        # shape IRI -> IRI of the schema file defining it
+        self.shape_schema: Dict[str, str] = {}
+        # shape IRI -> shape definition (compacted with an empty context)
+        self.shapes: Dict[str, Dict] = {}
+        # shape IRI -> target class IRI
+        self.target_class: Dict[str, str] = {}
+        # class IRI -> IRIs of the shapes targeting it
+        self.class_shapes: Dict[str, List[str]] = {}
+        # model of all shapes and the ontology, holding the sh:and edges (set by build_index)
+        self.model: Optional['ShapesModel'] = None
+        # shape IRI -> IRIs of all shapes referred to via sh:node
+        self.node_refs: Dict[str, List[str]] = {}
+        # shape IRI -> sh:path IRIs of its local property shapes (in order of definition)
+        self.paths: Dict[str, List[str]] = {}
+        # schema IRI -> IRIs of the schemas it imports
+        self.imports: Dict[str, List[str]] = {}
+        # class IRI -> IRIs of its direct superclasses (from the ontology)
+        self.superclasses: Dict[str, List[str]] = {}
+        # shape IRIs defined more than once
+        self.duplicate_shapes: List[str] = []
+        # shape IRI -> number of its local property shapes without sh:path
+        self.missing_paths: Dict[str, int] = {}
+        # shape IRI -> why the model does not support it (the shape is left out of the model)
+        self.unsupported: Dict[str, str] = {}
+
+    def conjoined(self, shape_id: str) -> List[str]:
+        """
+        Returns the shapes referred to from the sh:and conjunction of a shape.
+
+        :param shape_id: the IRI of the shape.
+        :return: the IRIs of the conjoined shapes.
+        """
+        if self.model is None:
+            return []
+        iris = self.model.iris
+        node = iris.lookup(shape_id)
+        return [iris.iri(target) for target in self.model.and_edges[node]] if node is not None else []
+
+
+def as_list(value: Union[None, Dict, List]) -> List:
+    """
+    Normalises a JSON-LD value that may be a single object or an array.
+
+    :param value: the value (may be None).
+    :return: the value as a list.
+    """
+    if value is None:
+        return []
+    elif isinstance(value, list):
+        return value
+    else:
+        return [value]
+
+
+def collect_node_refs(obj: Union[Dict, List], refs: List[str]) -> None:
+    """
+    Recursively collects all sh:node references contained in a shape definition.
+
+    :param obj: the (partial) shape definition.
+    :param refs: the list the references are appended to.
+    """
+    if isinstance(obj, list):
+        for item in obj:
+            collect_node_refs(item, refs)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            if key == SH + 'node':
+                refs.extend(map(lambda node: node['@id'], as_list(value)))
+            elif isinstance(value, (dict, list)):
+                collect_node_refs(value, refs)
+
+
+def local_property_shapes(shape: Dict) -> List[Dict]:
+    """
+    Returns the property shapes defined locally on a node shape,
+    i.e. given by sh:property directly or by a member of its sh:and conjunction.
+
+    :param shape: the node shape.
+    :return: the property shapes.
+    """
+    props = list(as_list(shape.get(SH + 'property')))
+    if SH + 'and' in shape:
+        for member in shape[SH + 'and']['@list']:
+            props.extend(as_list(member.get(SH + 'property')))
+    return props
+
+
+def add_schema(index: ShapesIndex, schema: Dict) -> None:
+    """
+    Adds a schema source file to the index.
+
+    :param index: the index.
+    :param schema: the schema, compacted with an empty context.
+    """
+    schema_id = schema['@id']
+    index.imports[schema_id] = list(map(lambda imp: imp['@id'] if isinstance(imp, dict) else imp,
+                                        as_list(schema.get(OWL_IMPORTS))))
+
+    for shape in as_list(schema.get(NXV_SHAPES)):
+        shape_id = shape['@id']
+        if shape_id in index.shapes:
+            index.duplicate_shapes.append(shape_id)
+
+        index.shapes[shape_id] = shape
+        index.shape_schema[shape_id] = schema_id
+
+        if SH + 'targetClass' in shape:
+            target_class = shape[SH + 'targetClass']['@id']
+            index.target_class[shape_id] = target_class
+            index.class_shapes.setdefault(target_class, []).append(shape_id)
+
+        refs: List[str] = []
+        collect_node_refs(shape, refs)
+        index.node_refs[shape_id] = refs
+
+        props = local_property_shapes(shape)
+        # complex paths (sh:inversePath etc.) are not compared
+        index.paths[shape_id] = list(map(lambda prop: prop[SH + 'path']['@id'],
+                                         filter(lambda prop: '@id' in prop.get(SH + 'path', {}), props)))
+        missing = len(list(filter(lambda prop: SH + 'path' not in prop, props)))
+        if missing > 0:
+            index.missing_paths[shape_id] = missing
+
+
+def add_ontology(index: ShapesIndex, ontology: Dict) -> None:
+    """
+    Adds the class definitions of the ontology to the index.
+
+    :param index: the index.
+    :param ontology: the ontology, compacted with an empty context.
+    """
+    for node in as_list(ontology.get('@graph')):
+        superclasses = list(map(lambda sup: sup['@id'], as_list(node.get(RDFS_SUBCLASS_OF))))
+        index.superclasses.setdefault(node['@id'], []).extend(superclasses)
+
+
+def build_index(schemas: List[Dict], ontology: Dict) -> ShapesIndex:
+    """
+    Builds the index from the schema source files and the ontology.
+
+    :param schemas: the schema source files, compacted with an empty context.
+    :param ontology: the ontology, compacted with an empty context.
+    :return: the index.
+    """
+    # the model builds on the helpers of this module
+    from rescs_shapes.model import load_model
+
+    index = ShapesIndex()
+    shapes: List[Dict] = []
+    for schema in schemas:
+        add_schema(index, schema)
+        shapes.extend(as_list(schema.get(NXV_SHAPES)))
+    add_ontology(index, ontology)
+    # the shapes with missing paths are reported as such, the model would reject them as well
+    index.model = load_model(list(filter(lambda shape: shape['@id'] not in index.missing_paths, shapes)), ontology,
+                             index.unsupported)
+    return index
+
+
+def find_and_cycles(index: ShapesIndex) -> List[Issue]:
+    """
+    Detects cycles in the sh:and conjunctions (a shape "inheriting" from itself),
+    using the adjacency arrays of the model.
+
+    :param index: the index.
+    :return: one issue per detected cycle.
+    """
+    if index.model is None:
+        return []
+    iris = index.model.iris
+    cycles = index.model.and_edges.cycles(shape.id for shape in index.model)
+    return [Issue('and-cycle', iris.iri(cycle[0]), ' -> '.join(map(iris.iri, cycle))) for cycle in cycles]
+
+
+def analyse(index: ShapesIndex) -> List[Issue]:
+    """
+    Runs all static checks on the index in a single pass over the shapes.
+
+    :param index: the index.
+    :return: the detected issues (empty if the library is consistent).
+    """
+    issues: List[Issue] = []
+
+    for shape_id in index.duplicate_shapes:
+        issues.append(Issue('duplicate-shape', shape_id, 'defined more than once'))
+
+    for shape_id, missing in index.missing_paths.items():
+        issues.append(Issue('missing-path', shape_id, str(missing) + ' property shape(s) without sh:path'))
+
+    for shape_id, error in index.unsupported.items():
+        issues.append(Issue('unsupported-shape', shape_id, error))
+
+    # schema IRI -> schemas actually referred to by its shapes
+    used_imports: Dict[str, Set[str]] = {schema_id: set() for schema_id in index.imports}
+
+    for shape_id, schema_id in index.shape_schema.items():
+
+        # dangling sh:node references and missing imports
+        for ref in index.node_refs[shape_id]:
+            ref_schema = index.shape_schema.get(ref)
+            if ref_schema is None:
+                issues.append(Issue('dangling-node', shape_id, 'sh:node ' + ref + ' is not defined'))
+            elif ref_schema != schema_id:
+                used_imports[schema_id].add(ref_schema)
+                if ref_schema not in index.imports[schema_id]:
+                    issues.append(Issue('missing-import', schema_id,
+                                        'refers to ' + ref + ' but does not import ' + ref_schema))
+
+        # duplicate paths among the local property shapes
+        seen: Set[str] = set()
+        for path in index.paths[shape_id]:
+            if path in seen:
+                issues.append(Issue('duplicate-path', shape_id, 'sh:path ' + path + ' is constrained more than once'))
+            seen.add(path)
+
+        # superclass shapes have to agree with rdfs:subClassOf in the ontology
+        # (the conjunction of a shape left out of the model is not known)
+        target_class = index.target_class.get(shape_id)
+        if target_class is None or shape_id in index.missing_paths or shape_id in index.unsupported:
+            continue
+        if target_class not in index.superclasses:
+            issues.append(Issue('superclass', shape_id, 'target class ' + target_class + ' is not defined in the ontology'))
+            continue
+
+        superclasses = index.superclasses[target_class]
+        inherited = index.conjoined(shape_id)
+        for super_shape in inherited:
+            super_class = index.target_class.get(super_shape)
+            if super_class is not None and super_class not in superclasses:
+                issues.append(Issue('superclass', shape_id, 'conjoins ' + super_shape + ' but ' + super_class +
+                                    ' is not a superclass of ' + target_class))
+        for super_class in superclasses:
+            for super_shape in index.class_shapes.get(super_class, []):
+                if super_shape not in inherited:
+                    issues.append(Issue('superclass', shape_id, 'does not conjoin ' + super_shape + ' although ' +
+                                        target_class + ' is a subclass of ' + super_class))
+
+    for schema_id, imports in index.imports.items():
+        for imported in imports:
+            if imported not in used_imports[schema_id]:
+                if imported in used_imports:
+                    issues.append(Issue('unused-import', schema_id, 'imports ' + imported + ' without referring to it'))
+                else:
+                    issues.append(Issue('missing-import', schema_id, 'imports ' + imported + ' which does not exist'))
+
+    issues.extend(find_and_cycles(index))
+
+    return issues
+
+
+def shape_digest(shape: Dict) -> str:
+    """
+    Computes a stable digest of a shape definition.
+
+    :param shape: the shape definition.
+    :return: the hex digest.
+    """
+    return hashlib.sha256(json.dumps(shape, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def changed_shapes(shapes: Dict[str, Dict], previous: Dict[str, str]) -> List[str]:
+    """
+    Determines the shapes whose definition differs from a previous build.
+
+    :param shapes: shape IRI -> shape definition.
+    :param previous: shape IRI -> digest as of the last successful build.
+    :return: the IRIs of new or modified shapes.
+    """
+    return [shape_id for shape_id, shape in shapes.items() if previous.get(shape_id) != shape_digest(shape)]
@@ -0,0 +1,295 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import glob
+from typing import Union
+from typing import List
+from typing import Dict
+from typing import Set
+
+from rescs_shapes.analysis import NXV_SHAPES, SH, as_list
+from rescs_shapes.files import SHAPES_DIR, ONTOLOGY_FILE, SHAPES_GRAPH_FILE, SHAPES_ONTOLOGY_GRAPH_FILE, \
+    SUBCLASS_CLOSURE_FILE, load_json, write_json
+from rescs_shapes.model import ShapesModel, load_model, model_to_jsonld, property_shape_to_jsonld
+
+CONTEXT = {
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "skos": "http://www.w3.org/2004/02/skos/core#",
+    "prov": "http://www.w3.org/ns/prov#",
+    "dcat": "http://www.w3.org/ns/dcat#",
+    "sh": "http://www.w3.org/ns/shacl#",
+    "shsh": "http://www.w3.org/ns/shacl-shacl#",
+    "dcterms": "http://purl.org/dc/terms/",
+    "schema": "http://schema.org/",
+    "rescs": "http://rescs.org/"
+}
+
+
+def determine_property_range(prop: Dict) -> Dict:
+    """
+    Given a property's datatype, class, or nodeKind, determines its range.
+
+    :param prop: the property whose range is to be determined
+    :return: a dictionary
+    {
+        'http://schema.org/rangeIncludes': {
+            '@id': range
+        }
+    }
+    """
+
+    if "http://www.w3.org/ns/shacl#datatype" in prop:
+        return {
+            'http://schema.org/rangeIncludes': prop['http://www.w3.org/ns/shacl#datatype']
+        }
+    elif "http://www.w3.org/ns/shacl#class" in prop:
+        return {
+            'http://schema.org/rangeIncludes': prop['http://www.w3.org/ns/shacl#class']
+        }
+    elif "http://www.w3.org/ns/shacl#nodeKind" in prop:
+        return {
+            'http://schema.org/rangeIncludes': prop['http://www.w3.org/ns/shacl#nodeKind']
+        }
+    else:
+        raise TypeError("Unknown range for " + str(prop))
+
+
+def generate_property_def(prop: Dict, shacl_target_class: str) -> Dict:
+    """
+    Given a SHACL PropertyShape, generates an RDF definition from it.
+    :param prop: the given PropertyShape.
+    :param shacl_target_class: the shape's target class.
+    :return: a dictionary representing the PropertyShape in RDF
+    """
+
+    prop_def = {
+        "@id": prop['http://www.w3.org/ns/shacl#path']['@id'],
+        "@type": "http://www.w3.org/1999/02/22-rdf-syntax-ns#Property",
+        "http://schema.org/domainIncludes": {
+            "@id": shacl_target_class
+        },
+        "http://www.w3.org/2000/01/rdf-schema#label": prop["http://www.w3.org/ns/shacl#name"],
+        "http://www.w3.org/2000/01/rdf-schema#comment": prop["http://www.w3.org/ns/shacl#description"]
+    }
+
+    if not 'http://www.w3.org/ns/shacl#or' in prop:
+        prop_def.update(determine_property_range(prop))
+    else:
+        defs = []
+        for p in prop['http://www.w3.org/ns/shacl#or']['@list']:
+            defs.append(determine_property_range(p))
+
+        prop_def.update({
+            'http://schema.org/rangeIncludes': list(map(lambda r: r['http://schema.org/rangeIncludes'], defs))
+        })
+
+    return prop_def
+
+
+def analyse_property_shapes(props: Union[Dict, List[Dict]], target_class: str) -> List[Dict]:
+    """
+    Given a PropertyShape or a list of PropertyShapes, turns them into an RDF representation.
+
+    :param props: a PropertyShape or a list of PropertyShapes.
+    :param target_class:
+    :return:
+    """
+
+    prop_defs = []
+    if isinstance(props, list):
+        for prop in props:
+            prop_defs.append(generate_property_def(prop, target_class))
+    else:
+        prop_defs.append(generate_property_def(props, target_class))
+
+    return prop_defs
+
+def generate_property_defs_from_shapes(model: ShapesModel) -> List:
+    """
+    From the SHACL shapes, generate the property definitions.
+
+    :param model: The model containing the shapes
+    :return: The property definitions.
+    """
+    # property defs
+    properties = []
+    # for the given NodeShapes, analyse their local properties
+    # (the properties of a superclass's shape are generated for the superclass)
+    for node_shape in model:
+
+        if node_shape.target_class is None or not node_shape.properties:
+            continue
+
+        target_class = model.iris.iri(node_shape.target_class)
+        props = [property_shape_to_jsonld(model, prop) for prop in node_shape.properties]
+        properties.extend(analyse_property_shapes(props, target_class))
+
+    return properties
+
+
+def load_schemas(shapes_dir: str = SHAPES_DIR) -> List[Dict]:
+    """
+    Reads the schema source files and expands their prefixes.
+
+    :param shapes_dir: the directory containing the schema source files.
+    :return: the schemas, compacted with an empty context.
+    """
+    from pyld import jsonld
+
+    schemas = []
+    # this only works for the current folder structure: shapes/[name]/schema.json
+    for filename in sorted(glob.iglob(shapes_dir + '/**/schema.json', recursive=True)):
+        schemas.append(jsonld.compact(load_json(filename), {}))
+    return schemas
+
+
+def load_ontology(ontology_file: str = ONTOLOGY_FILE) -> Dict:
+    """
+    Reads the ontology and expands its prefixes.
+
+    :param ontology_file: the path of the ontology file.
+    :return: the ontology, compacted with an empty context.
+    """
+    from pyld import jsonld
+
+    return jsonld.compact(load_json(ontology_file), {})
+
+
+def collect_shapes(schemas: List[Dict]) -> List[Dict]:
+    """
+    Collects the shapes defined in the given schemas.
+
+    :param schemas: the schemas, compacted with an empty context.
+    :return: the shapes.
+    """
+    shapes: List[Dict] = []
+    for schema in schemas:
+        shapes.extend(as_list(schema.get(NXV_SHAPES)))
+    return shapes
+
+
+def build_shapes_graph(schemas: List[Dict]) -> Dict:
+    """
+    Combines the shapes of all schemas into one graph
+    containing only standard SHACL statements.
+
+    :param schemas: the schemas, compacted with an empty context.
+    :return: the shapes graph.
+    """
+    from pyld import jsonld
+
+    return jsonld.compact({'@graph': model_to_jsonld(load_model(collect_shapes(schemas)))}, CONTEXT)
+
+
+def build_shapes_ontology_graph(schemas: List[Dict], ontology: Dict) -> Dict:
+    """
+    Combines the shapes, the classes of the ontology,
+    and the property definitions extracted from the shapes into one graph.
+
+    :param schemas: the schemas, compacted with an empty context.
+    :param ontology: the ontology, compacted with an empty context.
+    :return: the shapes and ontology graph.
+    """
+    from pyld import jsonld
+
+    model = load_model(collect_shapes(schemas))
+
+    graph = model_to_jsonld(model)
+    # append classes from ontology.json
+    graph.extend(as_list(ontology.get('@graph')))
+    # append properties extracted from SHACL shapes
+    graph.extend(generate_property_defs_from_shapes(model))
+
+    return jsonld.compact({'@graph': graph}, CONTEXT)
+
+
+def collect_instance_classes(obj: Union[Dict, List], classes: Set[str]) -> None:
+    """
+    Recursively collects the classes whose instances a shape definition refers to
+    (sh:targetClass and sh:class).
+
+    :param obj: the (partial) shape definition.
+    :param classes: the set the class IRIs are added to.
+    """
+    if isinstance(obj, list):
+        for item in obj:
+            collect_instance_classes(item, classes)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in (SH + 'targetClass', SH + 'class'):
+                classes.update(map(lambda cls: cls['@id'], as_list(value)))
+            elif isinstance(value, (dict, list)):
+                collect_instance_classes(value, classes)
+
+
+def build_subclass_closure(schemas: List[Dict], ontology: Dict) -> Dict[str, List[str]]:
+    """
+    Precomputes the transitive closure of rdfs:subClassOf as a lookup table,
+    restricted to the superclasses the shapes refer to (sh:targetClass, sh:class).
+    Adding rdf:type statements for these superclasses to the data
+    makes the shapes apply without including the ontology (see validate.add_inferred_types).
+
+    :param schemas: the schemas, compacted with an empty context.
+    :param ontology: the ontology, compacted with an empty context.
+    :return: the IRIs of the superclasses per class IRI (only classes having any).
+    """
+    shapes = collect_shapes(schemas)
+    model = load_model(shapes, ontology)
+
+    classes: Set[str] = set()
+    collect_instance_classes(shapes, classes)
+
+    closure = {}
+    for cls in as_list(ontology.get('@graph')):
+        superclasses = [superclass for superclass in model.superclasses(cls['@id']) if superclass in classes]
+        if len(superclasses) > 0:
+            closure[cls['@id']] = superclasses
+    return closure
+
+
+def build_files(shapes_dir: str = SHAPES_DIR, ontology_file: str = ONTOLOGY_FILE,
+                shapes_graph_file: Union[str, None] = SHAPES_GRAPH_FILE,
+                shapes_ontology_graph_file: Union[str, None] = SHAPES_ONTOLOGY_GRAPH_FILE,
+                subclass_closure_file: Union[str, None] = SUBCLASS_CLOSURE_FILE) -> Dict:
+    """
+    Builds the shapes graph, the shapes and ontology graph, and the subclass closure
+    and writes them to the given files (if not None).
+
+    :param shapes_dir: the directory containing the schema source files.
+    :param ontology_file: the path of the ontology file.
+    :param shapes_graph_file: the path the shapes graph is written to.
+    :param shapes_ontology_graph_file: the path the shapes and ontology graph is written to.
+    :param subclass_closure_file: the path the subclass closure is written to.
+    :return: the shapes graph.
+    """
+    schemas = load_schemas(shapes_dir)
+
+    shapes_graph = build_shapes_graph(schemas)
+    if shapes_graph_file is not None:
+        write_json(shapes_graph_file, shapes_graph)
+
+    if shapes_ontology_graph_file is not None or subclass_closure_file is not None:
+        ontology = load_ontology(ontology_file)
+        if shapes_ontology_graph_file is not None:
+            write_json(shapes_ontology_graph_file, build_shapes_ontology_graph(schemas, ontology))
+        if subclass_closure_file is not None:
+            write_json(subclass_closure_file, build_subclass_closure(schemas, ontology))
+
+    return shapes_graph
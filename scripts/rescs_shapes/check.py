@@ -0,0 +1,128 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from typing import Dict, List, Tuple
+
+from rescs_shapes.analysis import Issue, ShapesIndex, as_list, build_index, analyse, changed_shapes, shape_digest
+from rescs_shapes.build import load_schemas, load_ontology, build_shapes_graph
+from rescs_shapes.files import SHAPES_DIR, ONTOLOGY_FILE, SHACL_SHACL_FILE, SHACL_SHACL_STATE_FILE, load_json, \
+    write_json
+
+
+def load_index(shapes_dir: str = SHAPES_DIR, ontology_file: str = ONTOLOGY_FILE) -> ShapesIndex:
+    """
+    Loads the schema source files and the ontology and indexes them.
+
+    :param shapes_dir: the directory containing the schema source files.
+    :param ontology_file: the path of the ontology file.
+    :return: the index.
+    """
+    return build_index(load_schemas(shapes_dir), load_ontology(ontology_file))
+
+
+def built_shapes(schemas: List[Dict]) -> Dict[str, Dict]:
+    """
+    Builds the shapes graph (as written to ontology/shapes_graph.json) and indexes its node shapes,
+    so that shacl-shacl validates what is actually generated rather than the source files.
+
+    :param schemas: the schemas, compacted with an empty context.
+    :return: shape IRI -> shape definition of the shapes graph (compacted with an empty context).
+    """
+    from pyld import jsonld
+
+    return {shape['@id']: shape for shape in as_list(jsonld.compact(build_shapes_graph(schemas), {}).get('@graph'))}
+
+
+def check_shapes(index: ShapesIndex) -> List[Issue]:
+    """
+    Statically checks the shapes library for inconsistencies.
+
+    :param index: the index.
+    :return: the detected issues (empty if the library is consistent).
+    """
+    return analyse(index)
+
+
+def load_state(state_file: str = SHACL_SHACL_STATE_FILE) -> Dict:
+    """
+    Reads the state of the last successful shacl-shacl validation.
+
+    :param state_file: the path of the state file.
+    :return: the state (empty if there was no successful build yet).
+    """
+    try:
+        return load_json(state_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def validate_shapes(shapes: Dict[str, Dict], shape_ids: List[str], shacl_shacl: str) -> Tuple[bool, str]:
+    """
+    Validates the given shapes against shacl-shacl.
+
+    :param shapes: shape IRI -> shape definition of the shapes graph (see built_shapes).
+    :param shape_ids: the IRIs of the shapes to be validated.
+    :param shacl_shacl: the shacl-shacl shapes graph in Turtle.
+    :return: whether all given shapes conform and the validation report.
+    """
+    from rdflib import Graph
+    from pyshacl import validate
+
+    data_graph: Graph = Graph()
+    data_graph.parse(data=json.dumps({'@graph': [shapes[shape_id] for shape_id in shape_ids]}), format='json-ld')
+    shacl_graph: Graph = Graph()
+    shacl_graph.parse(data=shacl_shacl, format='turtle')
+
+    conforms, _, results_text = validate(data_graph, shacl_graph=shacl_graph)
+    return bool(conforms), str(results_text)
+
+
+def validate_changed_shapes(shapes: Dict[str, Dict], full: bool = False, shacl_shacl_file: str = SHACL_SHACL_FILE,
+                            state_file: str = SHACL_SHACL_STATE_FILE) -> Tuple[bool, List[str], str]:
+    """
+    Validates the shapes that changed since the last successful run against shacl-shacl
+    and records the new state if they conform.
+
+    :param shapes: shape IRI -> shape definition of the shapes graph (see built_shapes).
+    :param full: if set to True, all shapes are validated.
+    :param shacl_shacl_file: the path of the shacl-shacl shapes graph.
+    :param state_file: the path of the state file.
+    :return: whether the shapes conform, the IRIs of the validated shapes, and the validation report.
+    """
+    f = open(shacl_shacl_file)
+    shacl_shacl = f.read()
+    f.close()
+
+    state = load_state(state_file)
+    validator_digest = shape_digest({'shacl-shacl': shacl_shacl})
+    previous: Dict[str, str] = state.get('shapes', {}) if state.get('validator') == validator_digest else {}
+
+    to_validate = list(shapes.keys()) if full else changed_shapes(shapes, previous)
+    results_text = ''
+    if len(to_validate) > 0:
+        conforms, results_text = validate_shapes(shapes, to_validate, shacl_shacl)
+        if not conforms:
+            return False, to_validate, results_text
+
+    # only record the state once every shape has passed
+    write_json(state_file, {
+        'validator': validator_digest,
+        'shapes': {shape_id: shape_digest(shape) for shape_id, shape in shapes.items()}
+    })
+
+    return True, to_validate, results_text
@@ -0,0 +1,279 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import argparse
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Each command imports its implementation (and with it pyld, rdflib, pyshacl or requests) only when it is run,
+# so that --help and argument errors return immediately.
+
+
+def run_build(args: argparse.Namespace) -> int:
+    from rescs_shapes.build import build_files
+
+    build_files()
+    return 0
+
+
+def run_transform(args: argparse.Namespace) -> int:
+    from rescs_shapes.transform import transform_file
+
+    transform_file()
+    return 0
+
+
+def run_check(args: argparse.Namespace) -> int:
+    from rescs_shapes.analysis import build_index
+    from rescs_shapes.build import load_schemas, load_ontology
+    from rescs_shapes.check import built_shapes, check_shapes, validate_changed_shapes
+    from rescs_shapes.files import SHAPES_DIR
+
+    schemas = load_schemas(args.shapes_dir or SHAPES_DIR)
+    index = build_index(schemas, load_ontology())
+
+    issues = check_shapes(index)
+    if len(issues) > 0:
+        print('Inconsistencies detected in SHACL shapes:', file=sys.stderr)
+        for kind in sorted(set(map(lambda issue: issue.kind, issues))):
+            print(kind + ':', file=sys.stderr)
+            for issue in filter(lambda issue: issue.kind == kind, issues):
+                print('  ' + issue.subject + ': ' + issue.message, file=sys.stderr)
+        return 1
+
+    if not args.skip_shacl_shacl:
+        shapes = built_shapes(schemas)
+        conforms, validated, results_text = validate_changed_shapes(shapes, full=args.full)
+        print('shacl-shacl: validated ' + str(len(validated)) + ' of ' + str(len(shapes)) + ' shape(s)')
+        if not conforms:
+            print(results_text, file=sys.stderr)
+            print('SHACL shapes did not pass shacl-shacl validation', file=sys.stderr)
+            return 1
+
+    return 0
+
+
+def run_register(args: argparse.Namespace) -> int:
+    from decouple import config
+    from rescs_shapes.register import register_schemas
+
+    # TOKEN has to be set
+    # in file .env (project root): TOKEN="..."
+    verify_ssl: bool = bool(int(config('VERIFY_SSL')))  # throws an uncaught error if not numerical / integer
+
+    for schema_name, creation_res in register_schemas(config('NEXUS'), config('ORG'), config('PROJECT'),
+                                                      config('TOKEN'), verify_ssl):
+        print(schema_name)
+        print(creation_res)
+    return 0
+
+
+def run_validate(args: argparse.Namespace) -> int:
+    from rescs_shapes.files import SHAPES_GRAPH_FILE, SHAPES_GRAPH_TRANSFORMED_FILE
+    from rdflib import URIRef
+    from rescs_shapes.report import ReportAggregator
+    from rescs_shapes.validate import load_graph, load_subclass_closure, validate_data, iter_results
+
+    subclass_closure = None
+    if args.transformed:
+        # inheritance is resolved by adding the inferred rdf:type statements instead of including the ontology
+        shapes = load_graph(SHAPES_GRAPH_TRANSFORMED_FILE)
+        subclass_closure = load_subclass_closure()
+    else:
+        shapes = load_graph(args.shapes or SHAPES_GRAPH_FILE)
+    ontology = load_graph(args.ontology) if args.ontology is not None else None
+
+    log = open(args.log, 'w') if args.log is not None else None
+    aggregator = ReportAggregator(args.sample_size, shapes, log)
+
+    if args.columnar:
+        status = run_columnar_validate(args, aggregator)
+    else:
+        status = 0
+        for data_file in args.data:
+            conforms, results_graph, results_text = validate_data(data_file, shapes, ontology, subclass_closure)
+            if not conforms:
+                status = 1
+                if args.summary is None:
+                    print(data_file + ':', file=sys.stderr)
+                    print(results_text, file=sys.stderr)
+                # the results graph of this file is no longer needed once aggregated,
+                # blank node focus nodes are named by the file they are described in
+                for result in iter_results(results_graph):
+                    aggregator.add(result, str(result.focus_node) if isinstance(result.focus_node, URIRef) else data_file)
+
+    if log is not None:
+        log.close()
+    if args.summary is not None:
+        aggregator.write(args.summary)
+    return status
+
+
+def run_ingest(args: argparse.Namespace) -> int:
+    from rescs_shapes.check import load_index
+    from rescs_shapes.columnar import load_columnar_validator
+    from rescs_shapes.files import SHAPES_GRAPH_TRANSFORMED_FILE, load_json
+    from rescs_shapes.ingest import ingest_resources, schemas_by_class
+    from rescs_shapes.report import ReportAggregator
+    from rescs_shapes.validate import load_graph, load_subclass_closure
+
+    if args.dry_run:
+        nexus_url, organisation, project, token, verify_ssl = '', '', '', '', True
+    else:
+        from decouple import config
+
+        # TOKEN has to be set
+        # in file .env (project root): TOKEN="..."
+        nexus_url, organisation, project, token = config('NEXUS'), config('ORG'), config('PROJECT'), config('TOKEN')
+        verify_ssl = bool(int(config('VERIFY_SSL')))  # throws an uncaught error if not numerical / integer
+
+    schemas = {} if args.no_schema else schemas_by_class(load_index())
+
+    # validate against the transformed shapes graph (reports point to the violated constraints, not to sh:and),
+    # inheritance is resolved by adding the rdf:type statements inferred from the subclass closure
+    subclass_closure = load_subclass_closure()
+    shapes = load_json(SHAPES_GRAPH_TRANSFORMED_FILE)
+    columnar = None if args.no_columnar else load_columnar_validator(subclass_closure=subclass_closure)
+    if columnar is not None:
+        # pyshacl only checks the resources that passed the columnar check, no need to check these constraints again
+        shapes = columnar.without_checked_constraints(shapes)
+    shapes_graph = load_graph(shapes)
+    log = open(args.log, 'w') if args.log is not None else None
+    aggregator = ReportAggregator(args.sample_size, shapes_graph, log) \
+        if args.summary is not None or log is not None else None
+
+    stats = ingest_resources(args.paths, nexus_url, organisation, project, token, verify_ssl, schemas=schemas,
+                             shapes=shapes_graph, dead_letter_file=args.dead_letter, checkpoint_file=args.checkpoint,
+                             batch_size=args.batch_size, workers=args.workers, dry_run=args.dry_run,
+                             aggregator=aggregator, columnar=columnar, subclass_closure=subclass_closure)
+    print(stats)
+    if log is not None:
+        log.close()
+    if aggregator is not None and args.summary is not None:
+        aggregator.write(args.summary)
+    return 0 if stats.invalid == 0 and stats.failed == 0 else 1
+
+
+def run_columnar_validate(args: argparse.Namespace, aggregator: Any) -> int:
+    from rescs_shapes.columnar import load_columnar_validator
+    from rescs_shapes.files import SHAPES_GRAPH_FILE, load_json
+
+    validator = load_columnar_validator(args.shapes or SHAPES_GRAPH_FILE)
+
+    status = 0
+    chunk: List[Tuple[str, Dict]] = []
+    for i, data_file in enumerate(args.data):
+        doc = load_json(data_file)
+        chunk.extend(map(lambda resource: (data_file, resource), doc if isinstance(doc, list) else [doc]))
+        if len(chunk) < args.chunk_size and i < len(args.data) - 1:
+            continue
+
+        errors: Dict[int, str] = {}
+        for position, result in validator.validate(list(map(lambda item: item[1], chunk)), errors):
+            status = 1
+            data_file = chunk[position][0]
+            if args.summary is None:
+                print(data_file + ': ' + result.focus_node + ' ' + result.path + ' "' + result.value + '": ' +
+                      result.message, file=sys.stderr)
+            aggregator.add(result, data_file if result.focus_node.startswith('_:') else None)
+        for position, error in errors.items():
+            status = 1
+            print(chunk[position][0] + ': ' + error, file=sys.stderr)
+        chunk = []
+
+    return status
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Creates the parser for the command line interface.
+
+    :return: the parser.
+    """
+    parser = argparse.ArgumentParser(prog='rescs_shapes', description='Build tools for the RESCS SHACL shapes library.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='generate the shapes graph, the shapes and ontology graph, '
+                                                       'and the subclass closure')
+    build_parser.set_defaults(run=run_build)
+
+    transform_parser = subparsers.add_parser('transform', help='generate the shapes graph without sh:and')
+    transform_parser.set_defaults(run=run_transform)
+
+    check_parser = subparsers.add_parser('check', help='check the shapes library for inconsistencies')
+    check_parser.add_argument('--full', action='store_true',
+                              help='validate all shapes against shacl-shacl, not only those changed since the last build')
+    check_parser.add_argument('--skip-shacl-shacl', action='store_true', help='only run the static checks')
+    check_parser.add_argument('--shapes-dir',
+                              help='directory containing the schema source files (default: shapes)')
+    check_parser.set_defaults(run=run_check)
+
+    register_parser = subparsers.add_parser('register', help='register the schemas in Nexus (configured in .env)')
+    register_parser.set_defaults(run=run_register)
+
+    validate_parser = subparsers.add_parser('validate', help='validate JSON-LD data files against the shapes')
+    validate_parser.add_argument('data', nargs='+', help='JSON-LD data file(s)')
+    validate_parser.add_argument('-s', '--shapes', help='shapes graph (default: ontology/shapes_graph.json)')
+    validate_parser.add_argument('-e', '--ontology', help='ontology mixed into the data graph')
+    validate_parser.add_argument('-t', '--transformed', action='store_true',
+                                 help='validate against the transformed shapes graph (without sh:and), '
+                                      'adding the rdf:type statements inferred from the subclass closure')
+    validate_parser.add_argument('--columnar', action='store_true',
+                                 help='only check sh:datatype and sh:nodeKind constraints, in batches (fast)')
+    validate_parser.add_argument('--chunk-size', type=int, default=1000,
+                                 help='resources checked at once with --columnar (default: 1000)')
+    validate_parser.add_argument('--summary', help='write a summary of the violations to this file (.json or .csv) '
+                                                   'instead of printing the full reports (each data file is '
+                                                   'still validated as a whole, use ingest --dry-run for large files)')
+    validate_parser.add_argument('--log', help='write every violation to this file (NDJSON)')
+    validate_parser.add_argument('--sample-size', type=int, default=10,
+                                 help='sample focus nodes kept per violation in the summary (default: 10)')
+    validate_parser.set_defaults(run=run_validate)
+
+    ingest_parser = subparsers.add_parser('ingest', help='validate JSON-LD resources locally and upload the valid ones '
+                                                         'to Nexus (configured in .env)')
+    ingest_parser.add_argument('paths', nargs='+', help='JSON, JSON-LD or NDJSON file(s) or directories')
+    ingest_parser.add_argument('--batch-size', type=int, default=500, help='resources validated at once (default: 500)')
+    ingest_parser.add_argument('--workers', type=int, default=8, help='concurrent uploads (default: 8)')
+    ingest_parser.add_argument('--dead-letter', default='dead_letter.ndjson',
+                               help='file invalid resources are appended to (default: dead_letter.ndjson)')
+    ingest_parser.add_argument('--checkpoint', default='ingest_checkpoint.json',
+                               help='file the progress is recorded in (default: ingest_checkpoint.json)')
+    ingest_parser.add_argument('--no-schema', action='store_true',
+                               help='create resources without schema (no server-side validation)')
+    ingest_parser.add_argument('--no-columnar', action='store_true',
+                               help='do not check sh:datatype and sh:nodeKind constraints in batches before running pyshacl')
+    ingest_parser.add_argument('--dry-run', action='store_true',
+                               help='only validate, do not upload (the checkpoint is neither read nor written)')
+    ingest_parser.add_argument('--summary', help='write a summary of the violations to this file (.json or .csv)')
+    ingest_parser.add_argument('--log', help='write every violation to this file (NDJSON)')
+    ingest_parser.add_argument('--sample-size', type=int, default=10,
+                               help='sample focus nodes kept per violation in the summary (default: 10)')
+    ingest_parser.set_defaults(run=run_ingest)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the command given on the command line.
+
+    :param argv: the command line arguments (defaults to sys.argv).
+    :return: the exit status.
+    """
+    args = create_parser().parse_args(argv)
+    return args.run(args)
@@ -0,0 +1,444 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Batched checking of sh:datatype and sh:nodeKind constraints.
+
+The values of a chunk of resources are grouped into columns by (shape declaring the constraint, sh:path),
+e.g. all values of schema:distribution on nodes targeted by DatasetShape.
+Each column is then checked as a whole, evaluating the lexical form and node kind checks
+only once per distinct value of the column.
+Other constraints (sh:class, sh:minCount, sh:pattern etc.) are not checked, use pyshacl for those:
+the constraints checked here exactly as by pyshacl can be removed from the shapes graph given to pyshacl.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+from rescs_shapes.analysis import SH, as_list
+from rescs_shapes.files import SHAPES_GRAPH_FILE, load_json
+from rescs_shapes.model import ShapesModel, load_model, property_shape_to_jsonld
+from rescs_shapes.validate import ValidationResult
+
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+
+# node kinds of a value
+IRI, BLANK_NODE, LITERAL = 0, 1, 2
+
+NODE_KINDS: Dict[str, Set[int]] = {
+    SH + 'IRI': {IRI},
+    SH + 'BlankNode': {BLANK_NODE},
+    SH + 'Literal': {LITERAL},
+    SH + 'BlankNodeOrIRI': {BLANK_NODE, IRI},
+    SH + 'BlankNodeOrLiteral': {BLANK_NODE, LITERAL},
+    SH + 'IRIOrLiteral': {IRI, LITERAL}
+}
+
+_DECIMAL = r'[+-]?(\d+(\.\d*)?|\.\d+)'
+_TIMEZONE = r'(Z|[+-]\d{2}:\d{2})?'
+_DATE = r'-?\d{4,}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])'
+
+# lexical spaces of the datatypes used in the shapes, other datatypes are only compared by IRI
+LEXICAL_FORMS: Dict[str, Pattern] = {
+    XSD + 'integer': re.compile(r'[+-]?\d+'),
+    XSD + 'decimal': re.compile(_DECIMAL),
+    XSD + 'float': re.compile(_DECIMAL + r'([eE][+-]?\d+)?|[+-]?INF|NaN'),
+    XSD + 'double': re.compile(_DECIMAL + r'([eE][+-]?\d+)?|[+-]?INF|NaN'),
+    XSD + 'boolean': re.compile(r'true|false|1|0'),
+    XSD + 'date': re.compile(_DATE + _TIMEZONE),
+    XSD + 'dateTime': re.compile(_DATE + r'T([01]\d|2[0-3]):[0-5]\d:[0-5]\d(\.\d+)?' + _TIMEZONE)
+}
+
+# datatypes checked exactly as by pyshacl (the lexical forms of the datatypes above only approximate
+# the rdflib conversions pyshacl relies on)
+EXACT_DATATYPES = {XSD + 'string', RDF + 'langString'}
+
+# the lexical forms of these datatypes are whitespace collapsed (unlike xsd:string and rdf:langString),
+# leading and trailing whitespace is ignored
+XSD_WHITESPACE = ' \t\n\r'
+
+PREFIXES = {XSD: 'xsd:', RDF: 'rdf:', SH: 'sh:'}
+
+
+class Requirement(NamedTuple):
+    """
+    The sh:datatype and sh:nodeKind constraints of one property shape.
+    A value has to satisfy at least one alternative (more than one if given by sh:or),
+    an alternative is given as (datatype IRI or None, allowed node kinds or None).
+    """
+    alternatives: Tuple[Tuple[Optional[str], Optional[frozenset]], ...]
+    component: str
+    message: str
+
+
+class Column:
+    """
+    The values of one sh:path on the nodes targeted by one shape.
+    """
+
+    __slots__ = ('focus_nodes', 'documents', 'kinds', 'datatypes', 'lexical_forms')
+
+    def __init__(self) -> None:
+        self.focus_nodes: List[str] = []
+        # position of the resource the value belongs to within the chunk
+        self.documents: List[int] = []
+        self.kinds: List[int] = []
+        self.datatypes: List[Optional[str]] = []
+        self.lexical_forms: List[str] = []
+
+
+def prefixed(iri: str) -> str:
+    """
+    Abbreviates an IRI for messages.
+
+    :param iri: the IRI.
+    :return: the abbreviated IRI.
+    """
+    for namespace, prefix in PREFIXES.items():
+        if iri.startswith(namespace):
+            return prefix + iri[len(namespace):]
+    return iri
+
+
+def compile_requirement(prop: Dict) -> Optional[Requirement]:
+    """
+    Compiles the sh:datatype and sh:nodeKind constraints of a property shape.
+
+    :param prop: the property shape.
+    :return: the requirement, or None if the property shape has no such constraints.
+    """
+
+    def alternative(constraint: Dict) -> Tuple[Optional[str], Optional[frozenset]]:
+        datatype = constraint[SH + 'datatype']['@id'] if SH + 'datatype' in constraint else None
+        node_kind = constraint[SH + 'nodeKind']['@id'] if SH + 'nodeKind' in constraint else None
+        return datatype, frozenset(NODE_KINDS[node_kind]) if node_kind is not None else None
+
+    if SH + 'or' in prop:
+        members = prop[SH + 'or']['@list']
+        # only if every member can be checked, otherwise a value might conform to a member that is not checked here
+        if not all(map(lambda member: set(member.keys()) <= {SH + 'datatype', SH + 'nodeKind', SH + 'class'} and
+                                      (SH + 'datatype' in member or SH + 'nodeKind' in member), members)):
+            return None
+        alternatives = tuple(map(alternative, members))
+        names = map(lambda member: prefixed((member.get(SH + 'datatype') or member[SH + 'nodeKind'])['@id']), members)
+        return Requirement(alternatives, SH + 'OrConstraintComponent',
+                           'Value must conform to one or more of: ' + ', '.join(names))
+    elif SH + 'datatype' in prop:
+        datatype = prop[SH + 'datatype']['@id']
+        return Requirement(((datatype, None),), SH + 'DatatypeConstraintComponent',
+                           'Value is not Literal with datatype ' + prefixed(datatype))
+    elif SH + 'nodeKind' in prop:
+        node_kind = prop[SH + 'nodeKind']['@id']
+        return Requirement(((None, frozenset(NODE_KINDS[node_kind])),), SH + 'NodeKindConstraintComponent',
+                           'Value is not of Node Kind ' + prefixed(node_kind))
+    return None
+
+
+def satisfies(requirement: Requirement, kind: int, datatype: Optional[str], lexical_form: str) -> bool:
+    """
+    Checks a value against a requirement.
+
+    :param requirement: the requirement.
+    :param kind: the value's node kind.
+    :param datatype: the value's datatype (literals only).
+    :param lexical_form: the value's lexical form (literals only).
+    :return: True if the value satisfies one of the alternatives.
+    """
+    for alt_datatype, alt_kinds in requirement.alternatives:
+        if alt_kinds is not None and kind not in alt_kinds:
+            continue
+        if alt_datatype is not None:
+            if kind != LITERAL or datatype != alt_datatype:
+                continue
+            pattern = LEXICAL_FORMS.get(alt_datatype)
+            if pattern is not None and pattern.fullmatch(lexical_form.strip(XSD_WHITESPACE)) is None:
+                continue
+        return True
+    return False
+
+
+class ColumnarValidator:
+    """
+    Checks the sh:datatype and sh:nodeKind constraints of the shapes on chunks of JSON-LD resources.
+    """
+
+    def __init__(self, model: ShapesModel, subclass_closure: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        :param model: the model of the shapes.
+        :param subclass_closure: the subclass closure, if given a node is also checked against the shapes
+                                 targeting the superclasses of its types (see validate.add_inferred_types).
+        """
+        # shape IRI -> path -> requirements declared by this shape
+        self.requirements: Dict[str, Dict[str, List[Requirement]]] = {}
+        # shape IRI -> path -> shapes the values have to conform to (sh:node)
+        self.value_shapes: Dict[str, Dict[str, List[str]]] = {}
+        # shape IRI -> the shape itself and all shapes it is conjoined with (sh:and), transitively
+        self.closure: Dict[str, List[str]] = {}
+        # class IRI -> shapes targeting it or one of its superclasses
+        self.class_shapes: Dict[str, List[str]] = {}
+
+        iris = model.iris
+        for shape in model:
+            shape_id = iris.iri(shape.id)
+            if shape.target_class is not None:
+                self.class_shapes.setdefault(iris.iri(shape.target_class), []).append(shape_id)
+
+            self.closure[shape_id] = [shape_id] + [iris.iri(conjoined) for conjoined in
+                                                   model.and_edges.reachable(shape.id) if conjoined != shape.id]
+
+            requirements: Dict[str, List[Requirement]] = {}
+            value_shapes: Dict[str, List[str]] = {}
+            for property_shape in shape.properties:
+                path = iris.iri(property_shape.path)
+                prop = property_shape_to_jsonld(model, property_shape)
+                requirement = compile_requirement(prop)
+                if requirement is not None:
+                    requirements.setdefault(path, []).append(requirement)
+                for node in as_list(prop.get(SH + 'node')):
+                    value_shapes.setdefault(path, []).append(node['@id'])
+            self.requirements[shape_id] = requirements
+            self.value_shapes[shape_id] = value_shapes
+
+        if subclass_closure is not None:
+            targeting = self.class_shapes
+            self.class_shapes = dict(targeting)
+            for cls, superclasses in subclass_closure.items():
+                inherited = [s for superclass in superclasses for s in targeting.get(superclass, [])]
+                if len(inherited) > 0:
+                    self.class_shapes[cls] = targeting.get(cls, []) + inherited
+
+    def conjoined(self, shapes: Set[str]) -> Set[str]:
+        """
+        Adds the shapes the given shapes are conjoined with (sh:and), transitively.
+
+        :param shapes: the shape IRIs.
+        :return: the shapes and the shapes they are conjoined with.
+        """
+        return set(conjoined for shape_id in shapes for conjoined in self.closure.get(shape_id, [shape_id]))
+
+    def collect(self, nodes: List[Dict], document: int, columns: Dict[Tuple[str, str], Column]) -> None:
+        """
+        Appends the values of the nodes of a flattened JSON-LD resource to the columns.
+        As with pyshacl, a node has to conform to the shapes targeting its types
+        and to the shapes required for it by the nodes referring to it (sh:node).
+
+        :param nodes: the nodes.
+        :param document: the position of the resource within the chunk.
+        :param columns: (shape, path) -> column.
+        """
+        index = {node['@id']: node for node in nodes}
+        applicable: Dict[str, Set[str]] = {}
+        for node in nodes:
+            applicable[node['@id']] = self.conjoined(set(s for t in node.get('@type', [])
+                                                         for s in self.class_shapes.get(t, [])))
+
+        # propagate the shapes required by sh:node to the nodes referred to until nothing changes
+        pending = list(index.keys())
+        while len(pending) > 0:
+            focus = pending.pop()
+            for key, values in index[focus].items():
+                if key.startswith('@'):
+                    continue
+                required = self.conjoined(set(s for shape_id in applicable[focus]
+                                              for s in self.value_shapes.get(shape_id, {}).get(key, [])))
+                if len(required) == 0:
+                    continue
+                for value in values:
+                    referred = value.get('@id')
+                    if referred in index and not required <= applicable[referred]:
+                        applicable[referred] |= required
+                        pending.append(referred)
+
+        for node in nodes:
+            focus = node['@id']
+            for key, values in node.items():
+                if key.startswith('@'):
+                    continue
+
+                declaring = [shape_id for shape_id in applicable[focus] if key in self.requirements.get(shape_id, {})]
+                if len(declaring) == 0:
+                    continue
+
+                for value in values:
+                    if '@value' in value:
+                        kind = LITERAL
+                        raw = value['@value']
+                        if '@language' in value:
+                            datatype: Optional[str] = RDF + 'langString'
+                            lexical_form = str(raw)
+                        elif isinstance(raw, bool):
+                            datatype, lexical_form = value.get('@type', XSD + 'boolean'), 'true' if raw else 'false'
+                        elif isinstance(raw, int):
+                            datatype, lexical_form = value.get('@type', XSD + 'integer'), str(raw)
+                        elif isinstance(raw, float):
+                            datatype, lexical_form = value.get('@type', XSD + 'double'), repr(raw)
+                        else:
+                            datatype, lexical_form = value.get('@type', XSD + 'string'), str(raw)
+                    elif '@list' in value:
+                        # a list is represented by its first node, the empty list by rdf:nil
+                        kind = BLANK_NODE if len(value['@list']) > 0 else IRI
+                        datatype, lexical_form = None, '' if len(value['@list']) > 0 else RDF + 'nil'
+                    else:
+                        kind = BLANK_NODE if value['@id'].startswith('_:') else IRI
+                        datatype, lexical_form = None, value['@id']
+
+                    for shape_id in declaring:
+                        column = columns.get((shape_id, key))
+                        if column is None:
+                            column = columns[(shape_id, key)] = Column()
+                        column.focus_nodes.append(focus)
+                        column.documents.append(document)
+                        column.kinds.append(kind)
+                        column.datatypes.append(datatype)
+                        column.lexical_forms.append(lexical_form)
+
+    def check_column(self, shape_id: str, path: str, column: Column) -> List[Tuple[int, ValidationResult]]:
+        """
+        Checks the values of a column against the requirements declared for it.
+
+        :param shape_id: the shape declaring the requirements.
+        :param path: the path.
+        :param column: the column.
+        :return: the position of the resource and the validation result for each violation.
+        """
+        violations: List[Tuple[int, ValidationResult]] = []
+        for requirement in self.requirements[shape_id][path]:
+            # each distinct value is only checked once
+            checked: Dict[Tuple[int, Optional[str], str], bool] = {}
+            values = zip(column.kinds, column.datatypes, column.lexical_forms)
+            for i, value in enumerate(values):
+                ok = checked.get(value)
+                if ok is None:
+                    ok = checked[value] = satisfies(requirement, *value)
+                if not ok:
+                    violations.append((column.documents[i], ValidationResult(
+                        column.focus_nodes[i], path, column.lexical_forms[i], shape_id, requirement.component,
+                        SH + 'Violation', requirement.message)))
+        return violations
+
+    def validate(self, resources: List[Dict], errors: Optional[Dict[int, str]] = None) \
+            -> List[Tuple[int, ValidationResult]]:
+        """
+        Checks a chunk of resources.
+        Resources that cannot be flattened are skipped, the error is recorded if `errors` is given.
+
+        :param resources: the JSON-LD resources.
+        :param errors: position of the resource -> error, for the resources that could not be flattened (optional).
+        :return: the position of the resource and the validation result for each violation.
+        """
+        from pyld import jsonld
+
+        columns: Dict[Tuple[str, str], Column] = {}
+        for document, resource in enumerate(resources):
+            try:
+                # all nodes at the top level, the values of a node described in several places merged
+                nodes = jsonld.flatten(resource)
+            except Exception as e:
+                if errors is not None:
+                    errors[document] = 'invalid JSON-LD: ' + str(e)
+                continue
+            self.collect(nodes, document, columns)
+
+        violations: List[Tuple[int, ValidationResult]] = []
+        for (shape_id, path), column in columns.items():
+            violations.extend(self.check_column(shape_id, path, column))
+        return violations
+
+    def checked_constraints(self, shape_id: str, prop: Dict) -> List[str]:
+        """
+        Determines the constraints of a property shape this validator checks exactly as pyshacl.
+
+        :param shape_id: the node shape the property shape belongs to.
+        :param prop: the property shape.
+        :return: the constraint parameters (sh:datatype, sh:nodeKind or sh:or), empty if there are none.
+        """
+        requirement = compile_requirement(prop)
+        path = prop.get(SH + 'path')
+        if requirement is None or not isinstance(path, dict) or \
+                requirement not in self.requirements.get(shape_id, {}).get(path.get('@id', ''), []):
+            return []
+        # the lexical forms of the other datatypes are only checked approximately
+        if any(map(lambda alternative: alternative[0] is not None and alternative[0] not in EXACT_DATATYPES,
+                   requirement.alternatives)):
+            return []
+        if requirement.component == SH + 'OrConstraintComponent':
+            # sh:class is not checked here
+            return [SH + 'or'] if all(map(lambda member: SH + 'class' not in member, prop[SH + 'or']['@list'])) else []
+        elif requirement.component == SH + 'DatatypeConstraintComponent':
+            return [SH + 'datatype']
+        return [SH + 'nodeKind']
+
+    def without_checked_constraints(self, shapes_graph: Dict) -> Dict:
+        """
+        Removes the constraints this validator checks exactly as pyshacl from the property shapes of the node shapes,
+        so that pyshacl does not check them again on the resources that passed the columnar check.
+        The constraints of shapes referred to other than by sh:node or sh:and (e.g. from sh:or) are kept,
+        pyshacl evaluates these shapes as part of other constraints.
+
+        :param shapes_graph: the shapes graph (JSON-LD, not modified), e.g. the transformed shapes graph.
+        :return: the shapes graph without these constraints.
+        """
+        from pyld import jsonld
+
+        compacted = jsonld.compact(shapes_graph, {})
+        shapes = list(filter(lambda shape: shape.get('@type') == SH + 'NodeShape', as_list(compacted.get('@graph'))))
+        shape_ids = set(map(lambda shape: shape['@id'], shapes))
+
+        def referred(value: Any) -> Iterator[str]:
+            if isinstance(value, list):
+                for item in value:
+                    yield from referred(item)
+            elif isinstance(value, dict):
+                if value.get('@id') in shape_ids:
+                    yield value['@id']
+                for key, item in value.items():
+                    if key != '@id':
+                        yield from referred(item)
+
+        kept: Set[str] = set()
+        for shape in shapes:
+            for key, value in shape.items():
+                if key == SH + 'property':
+                    for prop in as_list(value):
+                        kept.update(referred([item for prop_key, item in prop.items() if prop_key != SH + 'node']))
+                elif key not in ('@id', SH + 'and'):
+                    kept.update(referred(value))
+
+        for shape in shapes:
+            if shape['@id'] in kept:
+                continue
+            for prop in as_list(shape.get(SH + 'property')):
+                for parameter in self.checked_constraints(shape['@id'], prop):
+                    del prop[parameter]
+        return compacted
+
+
+def load_columnar_validator(shapes_graph_file: str = SHAPES_GRAPH_FILE,
+                            subclass_closure: Optional[Dict[str, List[str]]] = None) -> ColumnarValidator:
+    """
+    Compiles the sh:datatype and sh:nodeKind constraints of the shapes graph.
+
+    :param shapes_graph_file: the path of the shapes graph (with sh:and, the conjunctions are resolved by the validator).
+    :param subclass_closure: the subclass closure (optional, see ColumnarValidator).
+    :return: the validator.
+    """
+    from pyld import jsonld
+
+    shapes = as_list(jsonld.compact(load_json(shapes_graph_file), {}).get('@graph'))
+    return ColumnarValidator(load_model(list(filter(lambda shape: shape.get('@type') == SH + 'NodeShape', shapes))),
+                             subclass_closure)
@@ -0,0 +1,68 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+from typing import Dict
+
+
+def absolute_from_repo_path(relative_path: str) -> str:
+    """
+    Given a path relative to the repository root,
+    returns the absolute path.
+
+    :param relative_path: the path relative to the repository root.
+    :return: the absolute path.
+    """
+    return os.path.join(os.path.dirname(__file__), '..', '..', relative_path)
+
+
+SHAPES_DIR = absolute_from_repo_path('shapes')
+ONTOLOGY_FILE = absolute_from_repo_path('ontology/ontology.json')
+SHAPES_GRAPH_FILE = absolute_from_repo_path('ontology/shapes_graph.json')
+SHAPES_ONTOLOGY_GRAPH_FILE = absolute_from_repo_path('ontology/shapes_ontology_graph.json')
+SHAPES_GRAPH_TRANSFORMED_FILE = absolute_from_repo_path('ontology/shapes_graph_transformed.json')
+# class IRI -> IRIs of its superclasses used by the shapes (sh:targetClass, sh:class)
+SUBCLASS_CLOSURE_FILE = absolute_from_repo_path('ontology/subclass_closure.json')
+SHACL_SHACL_FILE = absolute_from_repo_path('shacl-shacl/shacl-shacl.ttl')
+# digests of the shapes that passed shacl-shacl validation in the last successful build
+SHACL_SHACL_STATE_FILE = absolute_from_repo_path('ontology/shacl_shacl_state.json')
+
+
+def load_json(path: str) -> Dict:
+    """
+    Reads a JSON(-LD) file.
+
+    :param path: the file's path.
+    :return: the parsed document.
+    """
+    f = open(path)
+    doc = json.load(f)
+    f.close()
+    return doc
+
+
+def write_json(path: str, doc: Dict) -> None:
+    """
+    Writes a JSON(-LD) file.
+
+    :param path: the file's path.
+    :param doc: the document to be written.
+    """
+    f = open(path, 'w')
+    f.write(json.dumps(doc))
+    f.close()
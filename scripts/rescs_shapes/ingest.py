@@ -0,0 +1,452 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Bulk ingestion of JSON-LD resources into Nexus.
+
+Resources are read as a stream and processed in batches:
+each batch is validated locally against the shapes graph with a single pyshacl run,
+invalid resources are written to a dead-letter file together with their validation report,
+and valid resources are uploaded concurrently over a pooled connection
+while the next batch is being validated.
+Once a batch has been uploaded, the progress is recorded in a checkpoint file so that an interrupted load can be resumed.
+Resources of a batch that was not completed may be written to the dead-letter file or uploaded again when resuming.
+Resources that cannot be read (malformed JSON or JSON-LD) are written to the dead-letter file together with the error.
+"""
+
+import itertools
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, IO, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from rescs_shapes.analysis import ShapesIndex
+from rescs_shapes.columnar import ColumnarValidator
+from rescs_shapes.files import SHAPES_GRAPH_FILE, load_json
+from rescs_shapes.report import ReportAggregator
+from rescs_shapes.validate import ValidationResult, add_inferred_types, iter_results, load_graph
+
+# file extensions of the files read from a directory
+JSON_EXTENSIONS = ('.json', '.jsonld')
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+# schema id used for resources whose type is not targeted by any shape (no server-side validation)
+NO_SCHEMA = '_'
+
+
+class Document(NamedTuple):
+    """
+    A resource read from a source file.
+    """
+    source: str
+    # position of the resource within the source file
+    position: int
+    # the JSON-LD resource (the line read if it is not valid JSON)
+    resource: Any
+    # the error if the resource could not be read
+    error: Optional[str] = None
+
+
+class IngestStats:
+    """
+    Counts of the resources processed by an ingestion run.
+    """
+
+    def __init__(self) -> None:
+        self.read = 0
+        # skipped because already processed according to the checkpoint
+        self.skipped = 0
+        self.invalid = 0
+        self.uploaded = 0
+        self.failed = 0
+
+    def __str__(self) -> str:
+        return 'read: ' + str(self.read) + ', skipped: ' + str(self.skipped) + ', invalid: ' + str(self.invalid) + \
+               ', uploaded: ' + str(self.uploaded) + ', failed: ' + str(self.failed)
+
+
+def iter_source_files(paths: List[str]) -> Iterator[str]:
+    """
+    Lists the source files in the given paths, directories are walked recursively (in lexicographical order).
+
+    :param paths: files and directories.
+    :return: the source files.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield os.path.normpath(path)
+            continue
+
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith(JSON_EXTENSIONS + NDJSON_EXTENSIONS):
+                    yield os.path.normpath(os.path.join(root, filename))
+
+
+def iter_documents(paths: List[str], checkpoint: Dict[str, int], stats: IngestStats) -> Iterator[Document]:
+    """
+    Reads the resources from the given files and directories as a stream.
+    A JSON file contains one resource or an array of resources, an NDJSON file contains one resource per line.
+    Resources already processed according to the checkpoint are skipped.
+    A line (respectively a file) that is not valid JSON is returned as a resource with an error.
+
+    :param paths: files and directories.
+    :param checkpoint: source file -> number of resources already processed.
+    :param stats: the counts to be updated.
+    :return: the resources.
+    """
+    for source in iter_source_files(paths):
+        done = checkpoint.get(source, 0)
+
+        if source.endswith(NDJSON_EXTENSIONS):
+            f = open(source)
+            position = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                if position < done:
+                    stats.skipped += 1
+                else:
+                    stats.read += 1
+                    try:
+                        document = Document(source, position, json.loads(line))
+                    except ValueError as e:
+                        document = Document(source, position, line.rstrip('\n'), 'invalid JSON: ' + str(e))
+                    yield document
+                position += 1
+            f.close()
+        else:
+            try:
+                doc = load_json(source)
+            except ValueError as e:
+                if done == 0:
+                    stats.read += 1
+                    yield Document(source, 0, None, 'invalid JSON: ' + str(e))
+                continue
+            for position, resource in enumerate(doc if isinstance(doc, list) else [doc]):
+                if position < done:
+                    stats.skipped += 1
+                else:
+                    stats.read += 1
+                    yield Document(source, position, resource)
+
+
+def iter_batches(documents: Iterator[Document], batch_size: int) -> Iterator[List[Document]]:
+    """
+    Groups the resources into batches.
+
+    :param documents: the resources.
+    :param batch_size: the maximum number of resources per batch.
+    :return: the batches.
+    """
+    while True:
+        batch = list(itertools.islice(documents, batch_size))
+        if len(batch) == 0:
+            return
+        yield batch
+
+
+def load_checkpoint(checkpoint_file: str) -> Dict[str, int]:
+    """
+    Reads the checkpoint of a previous run.
+
+    :param checkpoint_file: the path of the checkpoint file.
+    :return: source file -> number of resources processed (empty if there is no checkpoint).
+    """
+    try:
+        return load_json(checkpoint_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(checkpoint_file: str, checkpoint: Dict[str, int]) -> None:
+    """
+    Writes the checkpoint, replacing the previous one atomically.
+
+    :param checkpoint_file: the path of the checkpoint file.
+    :param checkpoint: source file -> number of resources processed.
+    """
+    f = open(checkpoint_file + '.tmp', 'w')
+    f.write(json.dumps(checkpoint))
+    f.close()
+    os.replace(checkpoint_file + '.tmp', checkpoint_file)
+
+
+def schemas_by_class(index: ShapesIndex) -> Dict[str, str]:
+    """
+    Determines the schema to be used for the resources of each class.
+
+    :param index: the index of the shapes library.
+    :return: class IRI -> schema IRI.
+    """
+    return {target_class: index.shape_schema[shape_id] for shape_id, target_class in index.target_class.items()}
+
+
+def record_result(reports: List[Optional[List[Dict]]], batch: List[Document], position: int, result: ValidationResult,
+                  aggregator: Optional[ReportAggregator]) -> None:
+    """
+    Adds a validation result to the report of the resource it belongs to.
+
+    :param reports: the reports of the resources of the batch.
+    :param batch: the resources.
+    :param position: the position of the resource within the batch.
+    :param result: the validation result.
+    :param aggregator: the aggregator the validation result is added to (optional).
+    """
+    from rdflib import BNode
+
+    if aggregator is not None:
+        # blank node focus nodes are named by the resource they are described in
+        if isinstance(result.focus_node, BNode) or str(result.focus_node).startswith('_:'):
+            aggregator.add(result, batch[position].source + ':' + str(batch[position].position))
+        else:
+            aggregator.add(result)
+
+    report = reports[position]
+    if report is None:
+        report = reports[position] = []
+    report.append({
+        'focusNode': str(result.focus_node),
+        'resultPath': str(result.path) if result.path is not None else None,
+        'value': str(result.value) if result.value is not None else None,
+        'sourceConstraintComponent': str(result.component),
+        'resultMessage': str(result.message) if result.message is not None else None
+    })
+
+
+def prevalidate(batch: List[Document], shapes_graph: Any, aggregator: Optional[ReportAggregator] = None,
+                columnar: Optional[ColumnarValidator] = None, subclass_closure: Optional[Dict[str, List[str]]] = None) \
+        -> Tuple[List[Optional[List[Dict]]], List[List[str]], List[Optional[str]]]:
+    """
+    Validates a batch of resources against the shapes graph with as few pyshacl runs as possible.
+
+    If a columnar validator is given, the sh:datatype and sh:nodeKind constraints are checked for the whole batch first.
+    Resources violating them are rejected without running pyshacl (their report only contains these violations).
+    The constraints it checks can then be removed from the shapes graph (see
+    ColumnarValidator.without_checked_constraints).
+
+    The other resources are merged into data graphs (blank nodes are kept apart).
+    A resource describing an IRI that another resource in the same data graph describes or refers to
+    is put in a separate data graph, so that each resource is validated as if it was validated on its own.
+    Each validation result is attributed to the resource its focus node is described in.
+    Resources that cannot be read or parsed as JSON-LD are not validated, the error is returned instead.
+
+    To validate against the transformed shapes graph (without sh:and), the subclass closure has to be given:
+    the rdf:type statements inferred from it are added to the data graphs.
+
+    :param batch: the resources.
+    :param shapes_graph: the shapes graph (rdflib).
+    :param aggregator: the aggregator the validation results are added to (optional).
+    :param columnar: the validator used to check the sh:datatype and sh:nodeKind constraints first (optional).
+    :param subclass_closure: the subclass closure (see validate.load_subclass_closure), optional.
+    :return: for each resource, its validation results (None if it conforms), the types of its root nodes,
+             and the error if it could not be parsed (None otherwise).
+    """
+    from rdflib import BNode, Graph, RDF, URIRef
+    from pyshacl import validate
+
+    reports: List[Optional[List[Dict]]] = [None] * len(batch)
+    errors: List[Optional[str]] = list(map(lambda doc: doc.error, batch))
+
+    if columnar is not None:
+        readable = [i for i, error in enumerate(errors) if error is None]
+        columnar_errors: Dict[int, str] = {}
+        for position, result in columnar.validate(list(map(lambda i: batch[i].resource, readable)), columnar_errors):
+            record_result(reports, batch, readable[position], result, aggregator)
+        for position, error in columnar_errors.items():
+            errors[readable[position]] = error
+
+    # data graph, IRIs described in it, IRIs described in or referred to from it, subject -> position in batch
+    layers: List[Tuple[Graph, Set[Any], Set[Any], Dict[Any, int]]] = []
+    root_types: List[List[str]] = []
+
+    for i, doc in enumerate(batch):
+        if reports[i] is not None or errors[i] is not None:
+            root_types.append([])
+            continue
+
+        g: Graph = Graph()
+        try:
+            g.parse(data=json.dumps(doc.resource), format='json-ld')
+        except Exception as e:
+            errors[i] = 'invalid JSON-LD: ' + str(e)
+            root_types.append([])
+            continue
+
+        # blank node labels are scoped to a document
+        fresh: Dict[Any, Any] = {}
+        triples = []
+        for s, p, o in g:
+            if isinstance(s, BNode):
+                s = fresh.setdefault(s, BNode())
+            if isinstance(o, BNode):
+                o = fresh.setdefault(o, BNode())
+            triples.append((s, p, o))
+
+        subjects = set(map(lambda triple: triple[0], triples))
+        objects = set(map(lambda triple: triple[2], triples))
+        described = set(filter(lambda s: isinstance(s, URIRef), subjects))
+        mentioned = described | set(filter(lambda o: isinstance(o, URIRef), objects))
+
+        layer = next((layer for layer in layers
+                      if described.isdisjoint(layer[2]) and mentioned.isdisjoint(layer[1])), None)
+        if layer is None:
+            layer = (Graph(), set(), set(), {})
+            layers.append(layer)
+
+        data_graph, layer_described, layer_mentioned, described_in = layer
+        for triple in triples:
+            data_graph.add(triple)
+        layer_described.update(described)
+        layer_mentioned.update(mentioned)
+        for s in subjects:
+            described_in[s] = i
+
+        root_types.append(sorted(str(o) for s, p, o in triples if p == RDF.type and s not in objects))
+
+    for data_graph, _, _, described_in in layers:
+        if subclass_closure is not None:
+            add_inferred_types(data_graph, subclass_closure)
+        # the data graph is not used afterwards, no need for pyshacl to copy it
+        conforms, results_graph, _ = validate(data_graph, shacl_graph=shapes_graph, inplace=True)
+        if conforms:
+            continue
+
+        for result in iter_results(results_graph):
+            described_position = described_in.get(result.focus_node)
+            if described_position is not None:
+                record_result(reports, batch, described_position, result, aggregator)
+
+    return reports, root_types, errors
+
+
+def write_dead_letter(dead_letter: IO, doc: Document, report: Optional[List[Dict]] = None,
+                      error: Optional[str] = None) -> None:
+    """
+    Records a rejected resource in the dead-letter file (one JSON object per line).
+
+    :param dead_letter: the dead-letter file.
+    :param doc: the rejected resource.
+    :param report: its validation results if it is invalid.
+    :param error: the error message if the resource could not be read or uploaded.
+    """
+    dead_letter.write(json.dumps({
+        'source': doc.source,
+        'position': doc.position,
+        'resource': doc.resource,
+        'report': report,
+        'error': error
+    }) + '\n')
+
+
+def ingest_resources(paths: List[str], nexus_url: str, organisation: str, project: str, token: str,
+                     verify_ssl=True, schemas: Optional[Dict[str, str]] = None, shapes: Any = SHAPES_GRAPH_FILE,
+                     dead_letter_file: str = 'dead_letter.ndjson', checkpoint_file: str = 'ingest_checkpoint.json',
+                     batch_size: int = 500, workers: int = 8, dry_run: bool = False,
+                     aggregator: Optional[ReportAggregator] = None, columnar: Optional[ColumnarValidator] = None,
+                     subclass_closure: Optional[Dict[str, List[str]]] = None) -> IngestStats:
+    """
+    Validates the resources contained in the given files and directories and uploads the valid ones to Nexus.
+
+    :param paths: files and directories containing the resources.
+    :param nexus_url: The Nexus base URL.
+    :param organisation: The Nexus organisation.
+    :param project: The Nexus project.
+    :param token: The Nexus token.
+    :param verify_ssl: If set to False, SSL verification will be disabled.
+    :param schemas: class IRI -> schema IRI, resources of other classes are created without schema.
+    :param shapes: the shapes graph used for validation (a path, a JSON-LD document, or an rdflib graph),
+                   may be without the constraints checked by `columnar`.
+    :param dead_letter_file: the file invalid resources and failed uploads are appended to.
+    :param checkpoint_file: the file the progress is recorded in.
+    :param batch_size: the number of resources validated at once.
+    :param workers: the number of concurrent uploads.
+    :param dry_run: if set to True, the resources are only validated (all of them, the checkpoint is not used).
+    :param aggregator: the aggregator the validation results are added to (optional).
+    :param columnar: the validator used to check the sh:datatype and sh:nodeKind constraints first (optional).
+    :param subclass_closure: the subclass closure, required if `shapes` is the transformed shapes graph.
+    :return: the counts of the processed resources.
+    """
+    import requests
+    from utils.nexus_interaction import create_resource
+
+    stats = IngestStats()
+    # a dry run must not make a following load skip the resources it validated
+    checkpoint = {} if dry_run else load_checkpoint(checkpoint_file)
+    shapes_graph = load_graph(shapes)
+    schema_ids = schemas or {}
+
+    session = requests.Session()
+    session.mount(nexus_url, requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    dead_letter = open(dead_letter_file, 'a')
+
+    def complete(batch: List[Document], uploads: List[Tuple[Document, Future]]) -> None:
+        # waits for the uploads of a batch and records the progress,
+        # uploads are removed once recorded so that an interrupted call can be repeated
+        while len(uploads) > 0:
+            doc, future = uploads[0]
+            try:
+                future.result()
+                stats.uploaded += 1
+            except Exception as e:
+                stats.failed += 1
+                write_dead_letter(dead_letter, doc, error=str(e))
+            uploads.pop(0)
+        dead_letter.flush()
+
+        if not dry_run:
+            for doc in batch:
+                checkpoint[doc.source] = doc.position + 1
+            save_checkpoint(checkpoint_file, checkpoint)
+
+    # batches whose uploads have been submitted but not recorded yet (oldest first)
+    pending: List[Tuple[List[Document], List[Tuple[Document, Future]]]] = []
+    try:
+        for batch in iter_batches(iter_documents(paths, checkpoint, stats), batch_size):
+            reports, root_types, errors = prevalidate(batch, shapes_graph, aggregator, columnar, subclass_closure)
+
+            uploads: List[Tuple[Document, Future]] = []
+            for doc, report, types, error in zip(batch, reports, root_types, errors):
+                if error is not None:
+                    stats.invalid += 1
+                    write_dead_letter(dead_letter, doc, error=error)
+                elif report is not None:
+                    stats.invalid += 1
+                    write_dead_letter(dead_letter, doc, report=report)
+                elif not dry_run:
+                    schema_id = next((schema_ids[t] for t in types if t in schema_ids), NO_SCHEMA)
+                    uploads.append((doc, executor.submit(create_resource, doc.resource, schema_id, nexus_url,
+                                                         organisation, project, token, verify_ssl, session)))
+
+            pending.append((batch, uploads))
+
+            # the uploads of the previous batch ran while this batch was being validated
+            while len(pending) > 1:
+                complete(*pending[0])
+                pending.pop(0)
+    finally:
+        # record the submitted uploads, also if the load is interrupted (they are carried out anyway)
+        while len(pending) > 0:
+            complete(*pending[0])
+            pending.pop(0)
+        executor.shutdown()
+        dead_letter.close()
+        session.close()
+
+    return stats
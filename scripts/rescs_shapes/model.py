@@ -0,0 +1,509 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+A compact model of the shapes library.
+
+IRIs (and JSON-LD keywords) are interned to integer ids, shapes are held in read-only `__slots__` classes
+and their remaining terms in tuples, so the shapes of a loaded model cannot be modified (or aliased) by accident
+(only the IRI table grows when further IRIs are interned).
+The `sh:and` edges between node shapes and the `rdfs:subClassOf` edges of the ontology
+are stored as immutable adjacency arrays.
+
+Models are loaded from and serialized to JSON-LD compacted with an empty context (full IRIs),
+the serializers always return new objects.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rescs_shapes.analysis import RDFS_SUBCLASS_OF, SH, as_list
+
+SH_NODE_SHAPE = SH + 'NodeShape'
+SH_TARGET_CLASS = SH + 'targetClass'
+SH_AND = SH + 'and'
+SH_NODE = SH + 'node'
+SH_PROPERTY = SH + 'property'
+SH_PATH = SH + 'path'
+
+# keywords whose values are IRIs (interned like the keys)
+IRI_KEYWORDS = ('@id', '@type')
+
+
+class IRITable:
+    """
+    Interns IRIs to integer ids (in order of first occurrence).
+    """
+    __slots__ = ('ids', 'iris')
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.iris: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.iris)
+
+    def intern(self, iri: str) -> int:
+        """
+        Returns the id of the given IRI, assigning a new one if it has not been seen before.
+
+        :param iri: the IRI.
+        :return: the id.
+        """
+        iri_id = self.ids.get(iri)
+        if iri_id is None:
+            iri_id = len(self.iris)
+            self.ids[iri] = iri_id
+            self.iris.append(iri)
+        return iri_id
+
+    def lookup(self, iri: str) -> Optional[int]:
+        """
+        Returns the id of the given IRI without interning it.
+
+        :param iri: the IRI.
+        :return: the id or None if the IRI is unknown.
+        """
+        return self.ids.get(iri)
+
+    def iri(self, iri_id: int) -> str:
+        """
+        Returns the IRI with the given id.
+
+        :param iri_id: the id.
+        :return: the IRI.
+        """
+        return self.iris[iri_id]
+
+
+class Node(tuple):
+    """
+    A frozen JSON-LD object: a flat tuple of alternating key ids and frozen values
+    (sorted by key). Arrays are frozen to plain tuples, the values of @id and @type to IRI ids.
+    """
+    __slots__ = ()
+
+
+def freeze(value: Any, iris: IRITable) -> Any:
+    """
+    Turns a JSON-LD value into its immutable representation.
+
+    :param value: the value (compacted with an empty context).
+    :param iris: the table the IRIs are interned in.
+    :return: the frozen value.
+    """
+    if isinstance(value, dict):
+        terms: List[Any] = []
+        for key in sorted(value):
+            term = value[key]
+            if key in IRI_KEYWORDS:
+                frozen = tuple(iris.intern(t) for t in term) if isinstance(term, list) else iris.intern(term)
+            else:
+                frozen = freeze(term, iris)
+            terms.append(iris.intern(key))
+            terms.append(frozen)
+        return Node(terms)
+    elif isinstance(value, list):
+        return tuple(freeze(v, iris) for v in value)
+    else:
+        return value
+
+
+def thaw(value: Any, iris: IRITable) -> Any:
+    """
+    Turns a frozen value back into JSON-LD (creating new objects).
+
+    :param value: the frozen value.
+    :param iris: the table the IRIs were interned in.
+    :return: the value (compacted with an empty context).
+    """
+    if isinstance(value, Node):
+        obj = {}
+        for position in range(0, len(value), 2):
+            key = iris.iri(value[position])
+            term = value[position + 1]
+            if key in IRI_KEYWORDS:
+                obj[key] = [iris.iri(t) for t in term] if isinstance(term, tuple) else iris.iri(term)
+            else:
+                obj[key] = thaw(term, iris)
+        return obj
+    elif isinstance(value, tuple):
+        return [thaw(v, iris) for v in value]
+    else:
+        return value
+
+
+def ref_id(value: Any, iris: IRITable) -> int:
+    """
+    Interns the IRI of a JSON-LD reference (`{"@id": ...}`).
+
+    :param value: the reference.
+    :param iris: the table the IRI is interned in.
+    :return: the id of the IRI.
+    """
+    if not isinstance(value, dict) or '@id' not in value:
+        raise ValueError('Expected a reference, got ' + str(value))
+    return iris.intern(value['@id'])
+
+
+class PropertyShape:
+    """
+    A property shape: the id of its sh:path and all of its terms (including sh:path).
+    Read-only.
+    """
+    __slots__ = ('_path', '_terms')
+
+    def __init__(self, path: int, terms: Node) -> None:
+        self._path = path
+        self._terms = terms
+
+    @property
+    def path(self) -> int:
+        return self._path
+
+    @property
+    def terms(self) -> Node:
+        return self._terms
+
+
+class NodeShape:
+    """
+    A node shape. Its local property shapes are either given directly (sh:property)
+    or as the last member of its sh:and conjunction (`conjunction` is True),
+    the other members of the conjunction are stored as edges in the model.
+    The remaining terms (@type, labels, comments ...) are kept in `terms`.
+    Read-only.
+    """
+    __slots__ = ('_id', '_target_class', '_properties', '_conjunction', '_terms')
+
+    def __init__(self, shape_id: int, target_class: Optional[int], properties: Tuple[PropertyShape, ...],
+                 conjunction: bool, terms: Node) -> None:
+        self._id = shape_id
+        self._target_class = target_class
+        self._properties = properties
+        self._conjunction = conjunction
+        self._terms = terms
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @property
+    def target_class(self) -> Optional[int]:
+        return self._target_class
+
+    @property
+    def properties(self) -> Tuple[PropertyShape, ...]:
+        return self._properties
+
+    @property
+    def conjunction(self) -> bool:
+        return self._conjunction
+
+    @property
+    def terms(self) -> Node:
+        return self._terms
+
+
+class Adjacency:
+    """
+    Immutable adjacency arrays (compressed rows): the targets of node `n`
+    are `targets[offsets[n]:offsets[n + 1]]`. Nodes are IRI ids.
+    """
+    __slots__ = ('_offsets', '_targets')
+
+    def __init__(self, edges: Dict[int, List[int]], size: int) -> None:
+        offsets = [0]
+        targets: List[int] = []
+        for node in range(size):
+            targets.extend(edges.get(node, ()))
+            offsets.append(len(targets))
+        self._offsets: Tuple[int, ...] = tuple(offsets)
+        self._targets: Tuple[int, ...] = tuple(targets)
+
+    def __getitem__(self, node: int) -> Tuple[int, ...]:
+        if node + 1 >= len(self._offsets):
+            return ()
+        return self._targets[self._offsets[node]:self._offsets[node + 1]]
+
+    def reachable(self, node: int) -> List[int]:
+        """
+        Returns the nodes reachable from the given node (not including itself unless there is a cycle),
+        in depth-first order.
+
+        :param node: the start node.
+        :return: the reachable nodes.
+        """
+        seen = set()
+        result = []
+        stack = list(reversed(self[node]))
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            result.append(current)
+            stack.extend(reversed(self[current]))
+        return result
+
+    def cycles(self, nodes: Iterable[int]) -> List[List[int]]:
+        """
+        Detects the cycles reachable from the given nodes.
+        Iterative depth-first search visiting each node and edge once.
+
+        :param nodes: the start nodes.
+        :return: one path per detected cycle, starting and ending with the same node.
+        """
+        cycles: List[List[int]] = []
+        # 0: unvisited, 1: on the current path, 2: done
+        state: Dict[int, int] = {}
+
+        for start in nodes:
+            if state.get(start, 0) != 0:
+                continue
+
+            path: List[int] = [start]
+            stack = [iter(self[start])]
+            state[start] = 1
+            while stack:
+                child: Optional[int] = next(stack[-1], None)
+                if child is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif state.get(child, 0) == 1:
+                    cycles.append(path[path.index(child):] + [child])
+                elif state.get(child, 0) == 0:
+                    state[child] = 1
+                    path.append(child)
+                    stack.append(iter(self[child]))
+
+        return cycles
+
+
+class ShapesModel:
+    """
+    The node shapes of the library, the sh:and edges between them
+    and the rdfs:subClassOf edges of the ontology.
+    """
+    __slots__ = ('_iris', '_shapes', '_positions', '_and_edges', '_subclass_edges')
+
+    def __init__(self, iris: IRITable, shapes: Tuple[NodeShape, ...],
+                 and_edges: Adjacency, subclass_edges: Adjacency) -> None:
+        self._iris = iris
+        self._shapes = shapes
+        self._positions: Dict[int, int] = {shape.id: position for position, shape in enumerate(shapes)}
+        self._and_edges = and_edges
+        self._subclass_edges = subclass_edges
+
+    @property
+    def iris(self) -> IRITable:
+        return self._iris
+
+    @property
+    def shapes(self) -> Tuple[NodeShape, ...]:
+        return self._shapes
+
+    @property
+    def and_edges(self) -> Adjacency:
+        """
+        shape id -> ids of the shapes referred to from its sh:and conjunction
+        """
+        return self._and_edges
+
+    @property
+    def subclass_edges(self) -> Adjacency:
+        """
+        class id -> ids of its direct superclasses
+        """
+        return self._subclass_edges
+
+    def __iter__(self) -> Iterator[NodeShape]:
+        return iter(self.shapes)
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    def shape(self, iri: str) -> Optional[NodeShape]:
+        """
+        Looks up a node shape by its IRI.
+
+        :param iri: the IRI of the shape.
+        :return: the shape or None if there is no such shape.
+        """
+        shape_id = self.iris.lookup(iri)
+        if shape_id is None or shape_id not in self._positions:
+            return None
+        return self._shapes[self._positions[shape_id]]
+
+    def superclasses(self, class_iri: str) -> List[str]:
+        """
+        Returns all superclasses of the given class (the transitive closure of rdfs:subClassOf).
+
+        :param class_iri: the IRI of the class.
+        :return: the IRIs of the superclasses.
+        """
+        class_id = self.iris.lookup(class_iri)
+        if class_id is None:
+            return []
+        return [self.iris.iri(superclass) for superclass in self.subclass_edges.reachable(class_id)]
+
+
+def load_property_shape(prop: Dict, iris: IRITable) -> PropertyShape:
+    """
+    Loads a property shape.
+
+    :param prop: the property shape (compacted with an empty context).
+    :param iris: the table the IRIs are interned in.
+    :return: the property shape.
+    :raises ValueError: if its sh:path is missing or not an IRI (complex paths are not supported).
+    """
+    if SH_PATH not in prop:
+        raise ValueError('Property shape without sh:path: ' + str(prop))
+    return PropertyShape(ref_id(prop[SH_PATH], iris), freeze(prop, iris))
+
+
+def load_node_shape(shape: Dict, iris: IRITable, and_edges: Dict[int, List[int]]) -> NodeShape:
+    """
+    Loads a node shape. Its sh:and conjunction may only consist of sh:node references
+    and (as the last member) of the local property shapes.
+
+    :param shape: the node shape (compacted with an empty context).
+    :param iris: the table the IRIs are interned in.
+    :param and_edges: the edges of the sh:and conjunction are added to this dict (only if the shape can be loaded).
+    :return: the node shape.
+    :raises ValueError: if the shape is malformed or not supported by the model.
+    """
+    if shape.get('@type') != SH_NODE_SHAPE:
+        raise ValueError('Not a node shape: ' + str(shape.get('@id')))
+
+    shape_id = iris.intern(shape['@id'])
+    target_class = ref_id(shape[SH_TARGET_CLASS], iris) if SH_TARGET_CLASS in shape else None
+
+    properties = as_list(shape.get(SH_PROPERTY))
+    conjunction = SH_AND in shape
+    edges: List[int] = []
+    if conjunction:
+        members = shape[SH_AND].get('@list') if isinstance(shape[SH_AND], dict) else None
+        if not isinstance(members, list):
+            raise ValueError('sh:and of ' + shape['@id'] + ' is not a list')
+        for position, member in enumerate(members):
+            if list(member) == [SH_NODE]:
+                edges.append(ref_id(member[SH_NODE], iris))
+            elif list(member) == [SH_PROPERTY] and position == len(members) - 1 and not properties:
+                properties = as_list(member[SH_PROPERTY])
+            else:
+                raise ValueError('Unsupported sh:and member in ' + shape['@id'] + ': ' + str(member))
+
+    terms = {key: value for key, value in shape.items() if key not in ('@id', SH_TARGET_CLASS, SH_AND, SH_PROPERTY)}
+
+    node_shape = NodeShape(shape_id, target_class, tuple(load_property_shape(prop, iris) for prop in properties),
+                           conjunction, freeze(terms, iris))
+    if conjunction:
+        and_edges.setdefault(shape_id, []).extend(edges)
+    return node_shape
+
+
+def load_model(shapes: List[Dict], ontology: Optional[Dict] = None, errors: Optional[Dict[str, str]] = None) \
+        -> ShapesModel:
+    """
+    Loads the node shapes and the class hierarchy of the ontology into a model.
+    If `errors` is given, the shapes that cannot be loaded are left out and the error is recorded,
+    otherwise a ValueError is raised.
+
+    :param shapes: the node shapes (compacted with an empty context).
+    :param ontology: the ontology (compacted with an empty context), optional.
+    :param errors: shape IRI -> error, for the shapes that could not be loaded (optional).
+    :return: the model.
+    """
+    iris = IRITable()
+    and_edges: Dict[int, List[int]] = {}
+    loaded: List[NodeShape] = []
+    for shape in shapes:
+        try:
+            loaded.append(load_node_shape(shape, iris, and_edges))
+        except ValueError as e:
+            if errors is None:
+                raise
+            errors[shape['@id']] = str(e)
+    node_shapes = tuple(loaded)
+
+    subclass_edges: Dict[int, List[int]] = {}
+    if ontology is not None:
+        for cls in as_list(ontology.get('@graph')):
+            for superclass in as_list(cls.get(RDFS_SUBCLASS_OF)):
+                subclass_edges.setdefault(iris.intern(cls['@id']), []).append(ref_id(superclass, iris))
+
+    return ShapesModel(iris, node_shapes, Adjacency(and_edges, len(iris)), Adjacency(subclass_edges, len(iris)))
+
+
+def single_or_list(values: List) -> Any:
+    """
+    Returns a single value as is and several values as an array (like pyld does when compacting).
+
+    :param values: the values.
+    :return: the value or the array of values.
+    """
+    return values[0] if len(values) == 1 else values
+
+
+def property_shape_to_jsonld(model: ShapesModel, prop: PropertyShape) -> Dict:
+    """
+    Serializes a property shape.
+
+    :param model: the model the property shape belongs to.
+    :param prop: the property shape.
+    :return: the property shape (compacted with an empty context).
+    """
+    return thaw(prop.terms, model.iris)
+
+
+def node_shape_to_jsonld(model: ShapesModel, shape: NodeShape, conjunction: bool = True) -> Dict:
+    """
+    Serializes a node shape.
+
+    :param model: the model the node shape belongs to.
+    :param shape: the node shape.
+    :param conjunction: if False, the sh:and conjunction is left out and the local property shapes
+                        are given directly (inheritance then has to be resolved via the class hierarchy).
+    :return: the node shape (compacted with an empty context).
+    """
+    iris = model.iris
+    obj = thaw(shape.terms, iris)
+    obj['@id'] = iris.iri(shape.id)
+    if shape.target_class is not None:
+        obj[SH_TARGET_CLASS] = {'@id': iris.iri(shape.target_class)}
+
+    properties = [property_shape_to_jsonld(model, prop) for prop in shape.properties]
+    if conjunction and shape.conjunction:
+        members: List[Dict] = [{SH_NODE: {'@id': iris.iri(node)}} for node in model.and_edges[shape.id]]
+        if properties:
+            members.append({SH_PROPERTY: single_or_list(properties)})
+        obj[SH_AND] = {'@list': members}
+    elif properties:
+        obj[SH_PROPERTY] = single_or_list(properties)
+
+    return obj
+
+
+def model_to_jsonld(model: ShapesModel, conjunction: bool = True) -> List[Dict]:
+    """
+    Serializes the node shapes of a model.
+
+    :param model: the model.
+    :param conjunction: if False, the sh:and conjunctions are left out, see `node_shape_to_jsonld`.
+    :return: the node shapes (compacted with an empty context).
+    """
+    return [node_shape_to_jsonld(model, shape, conjunction) for shape in model.shapes]
@@ -0,0 +1,51 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Dict, Iterator, List, Tuple
+
+from rescs_shapes.files import SHAPES_DIR, load_json
+
+# order in which schemas are created (dependency)
+SCHEMA_ORDER: List[str] = ['thing', 'person', 'organization', 'place', 'creativework', 'intangible', 'structuredvalue',
+                           'contactpoint', 'monetaryamount', 'article', 'dataset', 'mediaobject', 'book',
+                           'scholarlyarticle', 'datadownload', 'grant', 'monetarygrant', 'project', 'researchproject']
+
+
+def register_schemas(nexus_url: str, organisation: str, project: str, token: str, verify_ssl=True,
+                     order: List[str] = SCHEMA_ORDER, shapes_dir: str = SHAPES_DIR) -> Iterator[Tuple[str, Dict]]:
+    """
+    Registers the schema source files in Nexus in the given order.
+    Schemas that are referred to from other schemas have to be created first.
+
+    :param nexus_url: The Nexus base URL.
+    :param organisation: The Nexus organisation.
+    :param project: The Nexus project.
+    :param token: The Nexus token.
+    :param verify_ssl: If set to False, SSL verification will be disabled.
+    :param order: The names of the schemas (directories in shapes_dir) in order of creation.
+    :param shapes_dir: The directory containing the schema source files.
+    :return: The name of each schema and its creation response from Nexus, as soon as it has been created.
+    """
+    from pyld import jsonld
+    from utils.nexus_interaction import create_schema
+
+    for schema_name in order:
+        schema = load_json(shapes_dir + '/' + schema_name + '/schema.json')
+
+        # expand all prefixes and get rid of remote schema
+        yield schema_name, create_schema(jsonld.compact(schema, {}), nexus_url, organisation, project, token,
+                                         verify_ssl)
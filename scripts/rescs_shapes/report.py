@@ -0,0 +1,243 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Aggregation of validation results.
+
+Instead of keeping every sh:ValidationResult, the results are consumed one by one
+and counted by (shape, path, constraint component, message),
+keeping only a few sample focus nodes per group.
+The memory needed thus depends on the number of distinct groups, not on the number of violations.
+Optionally, every result is written to an NDJSON log as soon as it is consumed.
+"""
+
+import csv
+import json
+from typing import Any, Dict, IO, Iterable, List, Optional, Tuple
+
+from rescs_shapes.validate import ValidationResult
+
+# phrases of pyshacl's messages followed by the focus node or the value
+NODE_ANCHORS = ('Node ', 'Value of ', 'values on ', 'Value ', 'value: ')
+
+
+def skip_term(message: str, start: int) -> int:
+    """
+    Finds the end of a node rendered by pyshacl (<IRI>, [ blank node description ], or Literal(...)).
+
+    :param message: the message.
+    :param start: the position of the node.
+    :return: the position after the node, or start if there is no node.
+    """
+    if message.startswith('<', start):
+        end = message.find('>', start)
+        return end + 1 if end != -1 else start
+    elif message.startswith('[', start) or message.startswith('Literal(', start):
+        depth = 0
+        in_string = False
+        i = start
+        while i < len(message):
+            c = message[i]
+            if in_string:
+                if c == '\\':
+                    i += 1
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c in '[(':
+                depth += 1
+            elif c in '])':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+    return start
+
+
+def message_template(message: str) -> str:
+    """
+    Replaces the data nodes in a pyshacl message by a placeholder,
+    so that messages only differing by focus node or value are grouped together.
+
+    :param message: the message.
+    :return: the message template.
+    """
+    template = ''
+    i = 0
+    while i < len(message):
+        anchor = next((anchor for anchor in NODE_ANCHORS if message.startswith(anchor, i)), None)
+        if anchor is None:
+            template += message[i]
+            i += 1
+            continue
+
+        template += anchor
+        i += len(anchor)
+        end = skip_term(message, i)
+        if end > i:
+            template += '{node}'
+            i = end
+
+    return template
+
+
+class ReportGroup:
+    """
+    The violations of one constraint (shape, path, constraint component, message).
+    """
+
+    __slots__ = ('count', 'samples')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.samples: List[str] = []
+
+
+class ReportAggregator:
+    """
+    Consumes validation results and aggregates them.
+    """
+
+    def __init__(self, sample_size: int = 10, shapes_graph: Any = None, log: Optional[IO] = None) -> None:
+        """
+        :param sample_size: the maximum number of sample focus nodes kept per group.
+        :param shapes_graph: the shapes graph (rdflib) used to name property shapes by the node shape they belong to.
+        :param log: a file every result is written to (NDJSON), optional.
+        """
+        self.sample_size = sample_size
+        self.shapes_graph = shapes_graph
+        self.log = log
+        self.total = 0
+        self.groups: Dict[Tuple[str, str, str, str], ReportGroup] = {}
+        # blank node shape -> name
+        self.shape_names: Dict[Any, str] = {}
+
+    def shape_name(self, shape: Any) -> str:
+        """
+        Names a shape. A blank node shape is named after the closest node shape with an IRI it is contained in.
+
+        :param shape: the shape (rdflib term).
+        :return: the name.
+        """
+        from rdflib import BNode
+
+        if not isinstance(shape, BNode) or self.shapes_graph is None:
+            return str(shape)
+
+        name = self.shape_names.get(shape)
+        if name is None:
+            node: Any = shape
+            while isinstance(node, BNode):
+                node = next(self.shapes_graph.subjects(object=node), None)
+            name = self.shape_names[shape] = str(node) if node is not None else str(shape)
+        return name
+
+    def add(self, result: ValidationResult, sample: Optional[str] = None) -> None:
+        """
+        Adds a validation result.
+
+        :param result: the validation result.
+        :param sample: the name the focus node is sampled by (defaults to the focus node).
+        """
+        self.total += 1
+        message = str(result.message) if result.message is not None else ''
+
+        key = (self.shape_name(result.shape), str(result.path) if result.path is not None else '',
+               str(result.component), message_template(message))
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = ReportGroup()
+        group.count += 1
+
+        sample = sample if sample is not None else str(result.focus_node)
+        if len(group.samples) < self.sample_size and sample not in group.samples:
+            group.samples.append(sample)
+
+        if self.log is not None:
+            self.log.write(json.dumps({
+                'focusNode': str(result.focus_node),
+                'resultPath': str(result.path) if result.path is not None else None,
+                'value': str(result.value) if result.value is not None else None,
+                'sourceShape': key[0],
+                'sourceConstraintComponent': str(result.component),
+                'resultSeverity': str(result.severity),
+                'resultMessage': message
+            }) + '\n')
+
+    def consume(self, results: Iterable[ValidationResult]) -> None:
+        """
+        Adds the validation results.
+
+        :param results: the validation results, e.g. from validate.iter_results.
+        """
+        for result in results:
+            self.add(result)
+
+    def summary(self) -> Dict:
+        """
+        Summarises the validation results, the most frequent violations first.
+
+        :return: the summary.
+        """
+        groups = sorted(self.groups.items(), key=lambda item: (-item[1].count, item[0]))
+        return {
+            'total': self.total,
+            'groups': [{
+                'shape': shape,
+                'path': path,
+                'component': component,
+                'message': message,
+                'count': group.count,
+                'sampleFocusNodes': group.samples
+            } for (shape, path, component, message), group in groups]
+        }
+
+    def write_json(self, path: str) -> None:
+        """
+        Writes the summary as JSON.
+
+        :param path: the path of the file.
+        """
+        f = open(path, 'w')
+        f.write(json.dumps(self.summary(), indent=2))
+        f.close()
+
+    def write_csv(self, path: str) -> None:
+        """
+        Writes the summary as CSV (one row per group, sample focus nodes separated by spaces).
+
+        :param path: the path of the file.
+        """
+        f = open(path, 'w', newline='')
+        writer = csv.writer(f)
+        writer.writerow(['shape', 'path', 'component', 'message', 'count', 'sample_focus_nodes'])
+        for group in self.summary()['groups']:
+            writer.writerow([group['shape'], group['path'], group['component'], group['message'], group['count'],
+                             ' '.join(group['sampleFocusNodes'])])
+        f.close()
+
+    def write(self, path: str) -> None:
+        """
+        Writes the summary as CSV if the path ends with .csv, as JSON otherwise.
+
+        :param path: the path of the file.
+        """
+        if path.endswith('.csv'):
+            self.write_csv(path)
+        else:
+            self.write_json(path)
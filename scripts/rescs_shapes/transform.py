@@ -0,0 +1,171 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from typing import List, Dict, Union
+
+from rescs_shapes.build import CONTEXT
+from rescs_shapes.files import ONTOLOGY_FILE, SHAPES_GRAPH_FILE, SHAPES_GRAPH_TRANSFORMED_FILE, load_json, write_json
+from rescs_shapes.model import load_model, model_to_jsonld
+
+
+def remove_and_conjunction_from_shapes(graph: List) -> List:
+    """
+    Removes sh:and conjunction from shapes.
+    If present, transforms the local properties (last element of sh:and) to sh:property.
+    Inheritance then has to be resolved when validating, either by adding the rdf:type statements inferred from
+    the subclass closure to the data graph (see validate.add_inferred_types) or by including the ontology.
+
+    :param graph: The graph containing the shapes (not modified).
+    :return: The transformed graph.
+    """
+
+    return model_to_jsonld(load_model(graph), conjunction=False)
+
+
+def determine_inherited_properties(ontology_file_path: str = ONTOLOGY_FILE,
+                                   transformed_graph_file_path: str = SHAPES_GRAPH_TRANSFORMED_FILE) -> Dict:
+    """
+    Determines properties defined on super classes of each shape.
+
+    :param ontology_file_path: path of ontology file
+    :param transformed_graph_file_path: path of transformed shapes graph
+    :return: a SPARQL Select results with the following variables:
+             1. shape (IRI of the node shape for which the inherited properties are determined),
+             2. superClassShape (shape targeting a superclass),
+             3. superClassShapePropPath (properties defined for this superclass)
+    """
+
+    from rdflib import Graph
+    from rdflib.query import Result
+
+    g: Graph = Graph()
+    g.parse(ontology_file_path)
+    g.parse(transformed_graph_file_path)
+
+    # For each node shape, determine its superclasses
+    # and the shapes and property definitions associated with those.
+    query = """
+PREFIX schema: <http://schema.org/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+PREFIX sh: <http://www.w3.org/ns/shacl#>
+
+SELECT ?shape ?superClassShape ?superClassShapePropPath WHERE {
+    ?shape a sh:NodeShape ;
+        sh:targetClass ?targetClass .       
+    
+    OPTIONAL {
+
+        ?targetClass rdfs:subClassOf+ ?superClass .
+        ?superClassShape sh:targetClass ?superClass .
+        ?superClassShape sh:property ?superClassShapeProp .
+        ?superClassShapeProp sh:path ?superClassShapePropPath .
+    }
+} ORDER BY ?shape ?superClassShape ?superClassShapePropPath
+    """
+
+    q_res: Result = g.query(query)
+
+    res = q_res.serialize(format='json')
+    if res is not None:
+        res_json = res.decode('utf-8')
+    else:
+        raise Exception('Could not read query results')
+
+    res_dict = json.loads(res_json)
+
+    return res_dict
+
+def close_shapes(transformed_shapes: Dict) -> Dict:
+    """
+    Adds closed:true to all node shapes and add the ignored properties (inherited properties).
+
+    Attention: This functionality cannot be used since sh:closed does not support inheritance,
+    see <https://stackoverflow.com/questions/70785194/shacl-closed-shape-with-superclass-inheritance>.
+
+    """
+    from pyld import jsonld
+
+    # Attention: shallow copy
+    copy = jsonld.compact(transformed_shapes.copy(), {})
+
+    props = determine_inherited_properties()
+
+    for node_shape in copy["@graph"]:
+        node_shape_id = node_shape['@id']
+
+        if node_shape_id == "http://rescs.org/dash/thing/ThingShape":
+            # only inclcude rdf:type for schema:Thing
+            node_shape['http://www.w3.org/ns/shacl#closed'] = True
+            node_shape['http://www.w3.org/ns/shacl#ignoredProperties'] = {
+                '@list': [
+                    {'@id': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'}
+                ]
+            }
+        else:
+            # print(node_shape_id)
+
+            # collect inherited property ids
+            inherited_props = list(filter(lambda res: res['shape']['value'] == node_shape_id, props['results']['bindings']))
+            inherited_prop_ids = list(map(lambda prop: prop['superClassShapePropPath']['value'],inherited_props))
+
+            # print(inherited_prop_ids)
+            # print('*******')
+
+            ignored_props = list(map(lambda prop: { '@id': prop}, inherited_prop_ids))
+            ignored_props.append({'@id': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'})
+
+            # close node shape and add inherited properties to ignored properties
+            node_shape['http://www.w3.org/ns/shacl#closed'] = True
+            node_shape['http://www.w3.org/ns/shacl#ignoredProperties'] = {
+                '@list': ignored_props
+            }
+
+    return copy
+
+
+def transform_shapes_graph(shapes_graph: Dict) -> Dict:
+    """
+    Transforms the shapes graph into a graph without sh:and conjunctions
+    (inheritance has to be resolved when validating, see validate.add_inferred_types).
+
+    :param shapes_graph: the shapes graph (not modified).
+    :return: the transformed shapes graph.
+    """
+    from pyld import jsonld
+
+    compacted = jsonld.compact(shapes_graph, {})
+
+    # remove sh:and from shapes graph (use inheritance instead when validating)
+    transformed_graph = remove_and_conjunction_from_shapes(compacted['@graph'])
+
+    return jsonld.compact(transformed_graph, CONTEXT)
+
+
+def transform_file(shapes_graph_file: str = SHAPES_GRAPH_FILE,
+                   shapes_graph_transformed_file: Union[str, None] = SHAPES_GRAPH_TRANSFORMED_FILE) -> Dict:
+    """
+    Reads the shapes graph, transforms it and writes the result to the given file (if not None).
+
+    :param shapes_graph_file: the path of the shapes graph.
+    :param shapes_graph_transformed_file: the path the transformed shapes graph is written to.
+    :return: the transformed shapes graph.
+    """
+    transformed = transform_shapes_graph(load_json(shapes_graph_file))
+    if shapes_graph_transformed_file is not None:
+        write_json(shapes_graph_transformed_file, transformed)
+    return transformed
@@ -0,0 +1,138 @@
+#
+#      RESCS SHACL Shapes: Build Tools for the RESCS SHACL Shapes Library
+#      Copyright (C) 2022 SWITCH
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU Affero General Public License as published
+#      by the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU Affero General Public License for more details.
+#
+#      You should have received a copy of the GNU Affero General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from rescs_shapes.analysis import SH
+from rescs_shapes.files import SHAPES_GRAPH_FILE, SUBCLASS_CLOSURE_FILE, load_json
+
+
+class ValidationResult(NamedTuple):
+    """
+    A sh:ValidationResult of a validation report (rdflib terms, None if not given).
+    Results of the columnar checks (see columnar.py) are given as strings, blank nodes prefixed with "_:".
+    """
+    focus_node: Any
+    path: Any
+    value: Any
+    shape: Any
+    component: Any
+    severity: Any
+    message: Any
+
+
+def load_graph(source: Union[str, Dict, Any], rdf_format: str = 'json-ld') -> Any:
+    """
+    Turns the given source into an rdflib graph.
+
+    :param source: a path, a JSON-LD document, or an rdflib graph (returned as is).
+    :param rdf_format: the serialisation format of a path.
+    :return: the graph.
+    """
+    from rdflib import Graph
+
+    if isinstance(source, Graph):
+        return source
+
+    g: Graph = Graph()
+    if isinstance(source, dict):
+        g.parse(data=json.dumps(source), format='json-ld')
+    else:
+        g.parse(source, format=rdf_format)
+    return g
+
+
+def load_subclass_closure(subclass_closure_file: str = SUBCLASS_CLOSURE_FILE) -> Dict[str, List[str]]:
+    """
+    Reads the subclass closure generated by the build.
+
+    :param subclass_closure_file: the path of the subclass closure.
+    :return: the IRIs of the superclasses per class IRI.
+    """
+    return load_json(subclass_closure_file)
+
+
+def add_inferred_types(data_graph: Any, subclass_closure: Dict[str, List[str]]) -> int:
+    """
+    Adds the rdf:type statements entailed by rdfs:subClassOf that the shapes need for targeting
+    (sh:targetClass) and sh:class, using the precomputed subclass closure instead of RDFS inference.
+    The graph is modified in place.
+
+    :param data_graph: the data graph (rdflib).
+    :param subclass_closure: the IRIs of the superclasses per class IRI (see load_subclass_closure).
+    :return: the number of rdf:type statements added.
+    """
+    from rdflib import RDF, URIRef
+
+    inferred = set()
+    for node, cls in data_graph.subject_objects(RDF.type):
+        for superclass in subclass_closure.get(str(cls), []):
+            triple = (node, RDF.type, URIRef(superclass))
+            if triple not in data_graph:
+                inferred.add(triple)
+
+    for triple in inferred:
+        data_graph.add(triple)
+    return len(inferred)
+
+
+def validate_data(data: Union[str, Dict, Any], shapes: Union[str, Dict, Any] = SHAPES_GRAPH_FILE,
+                  ontology: Optional[Union[str, Dict, Any]] = None,
+                  subclass_closure: Optional[Dict[str, List[str]]] = None) -> Tuple[bool, Any, str]:
+    """
+    Validates data against the shapes graph.
+    To validate against the transformed shapes graph, either the subclass closure or the ontology has to be given.
+
+    :param data: the data graph (a path, a JSON-LD document, or an rdflib graph).
+    :param shapes: the shapes graph (a path, a JSON-LD document, or an rdflib graph).
+    :param ontology: the ontology mixed into the data graph (optional).
+    :param subclass_closure: the subclass closure (see load_subclass_closure), optional.
+                             The inferred rdf:type statements are added to the data graph (in place if an rdflib graph is given).
+    :return: whether the data conforms, the results graph, and the results text.
+    """
+    from pyshacl import validate as shacl_validate
+
+    data_graph = load_graph(data)
+    if subclass_closure is not None:
+        add_inferred_types(data_graph, subclass_closure)
+
+    conforms, results_graph, results_text = shacl_validate(
+        data_graph,
+        shacl_graph=load_graph(shapes),
+        ont_graph=load_graph(ontology) if ontology is not None else None)
+    return bool(conforms), results_graph, str(results_text)
+
+
+def iter_results(results_graph: Any) -> Iterator[ValidationResult]:
+    """
+    Iterates over the results of a validation report.
+
+    :param results_graph: the results graph returned by pyshacl.
+    :return: the validation results.
+    """
+    from rdflib import RDF, URIRef
+
+    for result in results_graph.subjects(RDF.type, URIRef(SH + 'ValidationResult')):
+        yield ValidationResult(
+            results_graph.value(result, URIRef(SH + 'focusNode')),
+            results_graph.value(result, URIRef(SH + 'resultPath')),
+            results_graph.value(result, URIRef(SH + 'value')),
+            results_graph.value(result, URIRef(SH + 'sourceShape')),
+            results_graph.value(result, URIRef(SH + 'sourceConstraintComponent')),
+            results_graph.value(result, URIRef(SH + 'resultSeverity')),
+            results_graph.value(result, URIRef(SH + 'resultMessage')))
@@ -29,8 +29,9 @@ function validate () {
   status=$?
   if (($status != 0)); then
     printf "%s\n" "Test case test/$1/$2.json failed, running in single mode for details:" >&2  # write error message to stderr
-    # use transformed graph (no sh:and conjunctions) for better error reporting using inference instead
-    pyshacl -sf json-ld -s ../ontology/shapes_graph_transformed.json -ef json-ld -e ../ontology/ontology.json -df json-ld ../test/$1/$2.json
+    # use transformed graph (no sh:and conjunctions) for better error reporting,
+    # inheritance is resolved by adding the rdf:type statements inferred from ontology/subclass_closure.json
+    python3 -m rescs_shapes validate -t ../test/$1/$2.json
     exit 1
   fi
 }
@@ -50,6 +51,126 @@ function attempt () {
   fi
 }
 
+# Runs the static checks on a broken shapes library.
+# Expects the check to fail and to report each of the given kinds of issues.
+# arg1: directory containing the schema source files (in directory "test_shapes")
+# arg2...: kinds of issues expected to be reported
+function attempt_check () {
+  echo "attempting check: test_shapes/$1"
+  output=$(./check_shapes_consistency.py --skip-shacl-shacl --shapes-dir ../test_shapes/$1 2>&1)
+  status=$?
+  if (($status != 1)); then
+    printf "%s\n" "Check of test_shapes/$1 should have failed with exit code 1." >&2  # write error message to stderr
+    exit 1
+  fi
+  for kind in "${@:2}"; do
+    if [[ $output != *"$kind:"* ]]; then
+      printf "%s\n" "Check of test_shapes/$1 should have reported $kind." >&2  # write error message to stderr
+      exit 1
+    fi
+  done
+}
+
+# Checks the sh:datatype and sh:nodeKind constraints of all given test data in batches (columnar).
+# Expects the check to succeed.
+# arg1...: JSON-LD test data files (relative to directory "test")
+function validate_columnar () {
+  echo "validating (columnar): $# test data files"
+  python3 -m rescs_shapes validate --columnar $(for f in "$@"; do echo "../test/$f"; done)
+  status=$?
+  if (($status != 0)); then
+    printf "%s\n" "Columnar check of the test data failed (false positive)." >&2  # write error message to stderr
+    exit 1
+  fi
+}
+
+# Checks the sh:datatype and sh:nodeKind constraints of the given test data (columnar).
+# Expects the check to fail.
+# arg1: folder (in directory "test")
+# arg2: name of JSON-LD test data file in test/arg1
+function attempt_columnar () {
+  echo "attempting (columnar): test/$1/$2.json"
+  python3 -m rescs_shapes validate --columnar ../test/$1/$2.json 2> /dev/null
+  status=$?
+  if (($status != 1)); then
+    printf "%s\n" "Columnar check of test/$1/$2.json should have failed with exit code 1." >&2  # write error message to stderr
+    exit 1
+  fi
+}
+
+# Validates the given test data several times, writing a summary of the violations.
+# Expects the repeated violations to be aggregated into a single group.
+# arg1: folder (in directory "test")
+# arg2: name of JSON-LD test data file in test/arg1
+# arg3: number of times the file is validated
+function summarise () {
+  echo "summarising: test/$1/$2.json"
+  summary=$(mktemp --suffix .json)
+  python3 -m rescs_shapes validate --summary $summary $(for i in $(seq $3); do echo ../test/$1/$2.json; done)
+  groups=$(python3 -c 'import json, sys; s = json.load(open(sys.argv[1])); print(len(s["groups"]), s["total"])' $summary)
+  rm -f $summary
+  if [[ $groups != "1 $3" ]]; then
+    printf "%s\n" "Summary of test/$1/$2.json should have one group of $3 violations (groups, violations: $groups)." >&2
+    exit 1
+  fi
+}
+
+# Validates all test data with the bulk ingestion (dry run, nothing is uploaded),
+# with and without the columnar pre-check.
+# Expects exactly the given test data files to be written to the dead-letter file.
+# arg1...: JSON-LD test data files expected to be rejected (relative to directory "test")
+function ingest_dry_run () {
+  expected=$(for f in "$@"; do echo "../test/$f"; done | sort)
+  for option in "" "--no-columnar"; do
+    echo "ingesting (dry run $option): test"
+    dead_letter=$(mktemp)
+    checkpoint=$(mktemp -u)
+    python3 -m rescs_shapes ingest --dry-run $option --dead-letter $dead_letter --checkpoint $checkpoint ../test > /dev/null
+    rejected=$(python3 -c 'import json, sys; [print(json.loads(line)["source"]) for line in open(sys.argv[1])]' $dead_letter | sort)
+    rm -f $dead_letter $checkpoint
+    if [[ $rejected != "$expected" ]]; then
+      printf "%s\n" "Ingestion of test (dry run $option) should have rejected exactly:" $expected "but rejected:" $rejected >&2
+      exit 1
+    fi
+  done
+}
+
+# Runs the bulk ingestion of all test data as recommended: a dry run, then the load, then the load again (resumed).
+# The uploads are stubbed (create_resource returns without sending anything).
+# Expects the dry run not to write the checkpoint, the load to upload all valid resources
+# and to record all resources in the checkpoint, and the resumed load to skip all of them.
+# arg1: number of valid resources in the test data
+# arg2: number of invalid resources in the test data
+function ingest_resume () {
+  echo "ingesting (dry run, load, resumed load): test"
+  dead_letter=$(mktemp)
+  checkpoint=$(mktemp -u)
+  python3 -m rescs_shapes ingest --dry-run --dead-letter $dead_letter --checkpoint $checkpoint ../test > /dev/null
+  if [[ -e $checkpoint ]]; then
+    printf "%s\n" "Ingestion of test (dry run) should not have written the checkpoint." >&2  # write error message to stderr
+    rm -f $dead_letter $checkpoint
+    exit 1
+  fi
+  total=$(($1 + $2))
+  for expected in "read: $total, skipped: 0, invalid: $2, uploaded: $1, failed: 0" \
+                  "read: 0, skipped: $total, invalid: 0, uploaded: 0, failed: 0"; do
+    stats=$(NEXUS=http://localhost ORG=test PROJECT=test TOKEN=test VERIFY_SSL=1 python3 -c '
+import sys
+import utils.nexus_interaction
+utils.nexus_interaction.create_resource = lambda resource, *args: {}
+from rescs_shapes.cli import main
+sys.exit(main(sys.argv[1:]))' ingest --batch-size 5 --dead-letter $dead_letter --checkpoint $checkpoint ../test)
+    recorded=$(python3 -c 'import json, sys; print(sum(json.load(open(sys.argv[1])).values()))' $checkpoint)
+    if [[ $stats != "$expected" || $recorded != $total ]]; then
+      printf "%s\n" "Ingestion of test should have resulted in \"$expected\" with $total resources recorded" \
+        "(result: \"$stats\", recorded: $recorded)." >&2  # write error message to stderr
+      rm -f $dead_letter $checkpoint
+      exit 1
+    fi
+  done
+  rm -f $dead_letter $checkpoint
+}
+
 ./generate_shapes_graph.py
 status=$?
 if (($status != 0)); then
@@ -57,6 +178,7 @@ if (($status != 0)); then
   exit 1
 fi
 
+# static checks, then shacl-shacl validation of the generated shapes changed since the last successful run
 ./check_shapes_consistency.py
 status=$?
 if (($status != 0)); then
@@ -64,12 +186,8 @@ if (($status != 0)); then
   exit 1
 fi
 
-pyshacl -o /dev/null -sf turtle -s ../shacl-shacl/shacl-shacl.ttl -df json-ld ../ontology/shapes_graph.json
-status=$?
-if (($status != 0)); then
-  printf "%s\n" "SHACL Ssapes graph did not pass shacl-shacl validation" >&2  # write error message to stderr
-  exit 1
-fi
+attempt_check "broken" "and-cycle" "dangling-node" "missing-import" "unused-import" "superclass" "duplicate-path" \
+  "duplicate-shape" "missing-path" "unsupported-shape"
 
 ./transform_shapes_graph.py
 status=$?
@@ -102,3 +220,17 @@ attempt "thing" "bad_thing"
 attempt "person" "bad_person"
 attempt "organization" "bad_organization_keywords"
 
+validate_columnar "thing/thing.json" "creativework/creativework.json" "book/book.json" "article/article.json" \
+  "scholarlyarticle/scholarlyarticle.json" "datadownload/datadownload.json" "dataset/dataset.json" \
+  "mediaobject/mediaobject.json" "organization/organization.json" "project/project.json" \
+  "researchproject/researchproject.json" "person/person.json" "intangible/intangible.json" \
+  "structuredvalue/structuredvalue.json" "contactpoint/contactpoint.json" "monetaryamount/monetaryamount.json" \
+  "grant/grant.json" "monetarygrant/monetarygrant.json" "place/place.json"
+
+attempt_columnar "thing" "bad_thing"
+attempt_columnar "person" "bad_person"
+attempt_columnar "organization" "bad_organization_keywords"
+
+summarise "organization" "bad_organization_keywords" 3
+ingest_dry_run "thing/bad_thing.json" "person/bad_person.json" "organization/bad_organization_keywords.json"
+ingest_resume 19 3
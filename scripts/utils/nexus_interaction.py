@@ -16,7 +16,7 @@
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import requests
-from typing import Dict, Union
+from typing import Dict, Optional, Union
 from urllib import parse
 import json
 
@@ -152,3 +152,34 @@ def update_composite_view(composite_view: Dict, rev: int, nexus_url: str, organi
 
     except requests.exceptions.HTTPError as e:
         raise e
+
+
+def create_resource(resource: Dict, schema_id: str, nexus_url: str, organisation: str, project: str, token: str,
+                    verify_ssl=True, session: Optional[requests.Session] = None) -> Dict:
+    """
+    Given a resource, registers it in Nexus.
+
+    :param resource: The resource to be created (JSON-LD).
+    :param schema_id: The id of the schema the resource is validated against, "_" for none.
+    :param nexus_url: The Nexus base URL.
+    :param organisation: The Nexus organisation.
+    :param project: The Nexus project.
+    :param token: The Nexus token.
+    :param verify_ssl: If set to False, SSL verification will be disabled.
+    :param session: The session to be used (reuses pooled connections), a new connection is opened if None.
+    :return: The resource creation response from Nexus.
+    """
+
+    try:
+        req = (session or requests).post(
+            nexus_url + '/resources/' + organisation + '/' + project + '/' + parse.quote_plus(schema_id),
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {token}'
+            }, data=json.dumps(resource), verify=verify_ssl)
+
+        req.raise_for_status()
+
+        return req.json()
+    except requests.exceptions.HTTPError as e:
+        raise Exception(e.response.text)